@@ -10,6 +10,7 @@ class Settings(BaseSettings):
     claude_api_key: Optional[str] = None
     OPENAI_API_KEY: Optional[str] = None
     GOOGLE_SERVICE_ACCOUNT_JSON: Optional[str] = None  # Used in main.py
+    OPENAI_MAX_CONCURRENCY: int = 8  # Concurrent site update processing calls per process
 
 
     # VAPI Configuration
@@ -0,0 +1,126 @@
+"""
+In-process TTL cache
+
+Small LRU cache with per-entry expiry, used to keep hot Supabase lookups
+off the request path for a short time.
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import time
+
+
+class TTLCache:
+    """
+    LRU cache whose entries expire ttl seconds after they were set.
+
+    Usage:
+        cache = TTLCache(maxsize=1024, ttl=60)
+        cache.set("key", value)
+        cache.get("key")  # value, or None once expired/evicted
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept; least recently used are evicted first
+            ttl: Seconds an entry stays valid after it is set
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+            default: Returned when the key is missing or expired
+
+        Returns:
+            The cached value or default
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Optional override of the cache-wide TTL for this entry
+        """
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get a cached value, loading it on a miss.
+
+        Concurrent misses for the same key share a single loader call instead
+        of all hitting the backend. A loader result of None is treated as a
+        failed lookup and is not cached.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument coroutine function producing the value
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                value = self.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+
+                value = await loader()
+                if value is not None:
+                    self.set(key, value)
+                return value
+        finally:
+            if self._locks.get(key) is lock and not lock.locked():
+                del self._locks[key]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value (or default if missing/expired)"""
+        value = self.get(key, default)
+        self._data.pop(key, None)
+        return value
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
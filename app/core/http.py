@@ -0,0 +1,135 @@
+"""
+Shared HTTP clients
+
+Pooled httpx.AsyncClients are reused for outbound calls, so keep-alive
+connections survive between webhook requests instead of paying a fresh
+TCP + TLS handshake on every call. HTTP/2 is enabled (when the httpx[http2]
+extra is installed) so concurrent requests to the same host, e.g. parallel
+Supabase lookups, multiplex on one socket.
+
+- get_supabase_client(): PostgREST base URL and service-key headers baked in,
+  so calls are just `await client.get("/entities", params=...)`
+- get_openai_client(): OpenAI API base URL and key baked in, long timeout
+"""
+
+from typing import Dict, Optional
+import asyncio
+import logging
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx[http2] extra)
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+    logger.warning("h2 is not installed; shared HTTP clients will use HTTP/1.1")
+
+# Each webhook fans out to both hosts, so each gets its own right-sized pool:
+# many short Supabase requests, and a few long-running OpenAI ones
+SUPABASE_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=50)
+OPENAI_LIMITS = httpx.Limits(max_keepalive_connections=10, max_connections=20)
+
+# Supabase answers in well under a second, so fail fast; LLM calls can take tens of seconds
+HTTP_TIMEOUTS = {
+    "supabase": httpx.Timeout(3.0, connect=1.0),
+    "openai": httpx.Timeout(60.0, connect=2.0)
+}
+
+SUPABASE_REST_URL = f"{settings.SUPABASE_URL}/rest/v1"
+SUPABASE_HEADERS = {
+    "apikey": settings.SUPABASE_SERVICE_KEY,
+    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
+}
+# Per-request additions for JSON writes whose response body isn't needed
+SUPABASE_WRITE_HEADERS = {
+    "Content-Type": "application/json",
+    "Prefer": "return=minimal"
+}
+
+OPENAI_API_URL = "https://api.openai.com/v1"
+OPENAI_HEADERS = {
+    "Authorization": f"Bearer {settings.OPENAI_API_KEY}"
+}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_clients_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_client(name: str, **client_kwargs) -> httpx.AsyncClient:
+    """
+    Get a named shared client, creating it on first use.
+
+    Pooled connections belong to the event loop that opened them, so clients
+    are recreated if called from a different loop (e.g. test clients).
+    """
+    global _clients_loop
+
+    loop = asyncio.get_running_loop()
+    if _clients_loop is not loop:
+        _clients.clear()
+        _clients_loop = loop
+
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(**client_kwargs)
+        _clients[name] = client
+        logger.info(f"Created shared {name} HTTP client")
+
+    return client
+
+
+def get_supabase_client() -> httpx.AsyncClient:
+    """
+    Get the shared Supabase PostgREST client.
+
+    Requests use paths relative to /rest/v1 and already carry the service key.
+
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    return _get_client(
+        "supabase",
+        base_url=SUPABASE_REST_URL,
+        headers=SUPABASE_HEADERS,
+        http2=HTTP2_ENABLED,
+        limits=SUPABASE_LIMITS,
+        timeout=HTTP_TIMEOUTS["supabase"]
+    )
+
+
+def get_openai_client() -> httpx.AsyncClient:
+    """
+    Get the shared OpenAI API client.
+
+    Requests use paths relative to /v1 (e.g. "/chat/completions") and already
+    carry the API key.
+
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    return _get_client(
+        "openai",
+        base_url=OPENAI_API_URL,
+        headers=OPENAI_HEADERS,
+        http2=HTTP2_ENABLED,
+        limits=OPENAI_LIMITS,
+        timeout=HTTP_TIMEOUTS["openai"]
+    )
+
+
+async def close_http_clients() -> None:
+    """Close the shared HTTP clients and their pooled connections"""
+    global _clients_loop
+
+    if _clients_loop is asyncio.get_running_loop():
+        for client in _clients.values():
+            if not client.is_closed:
+                await client.aclose()
+
+    _clients.clear()
+    _clients_loop = None
@@ -0,0 +1,146 @@
+"""
+Batched writer for the vapi_logs table
+
+Log events are queued in memory and a background task flushes them to
+Supabase in bulk (PostgREST accepts a JSON array as a multi-row insert),
+so webhook handlers never wait on an audit-log round trip.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+import orjson
+
+from app.core.http import SUPABASE_WRITE_HEADERS, get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+class VapiLogWriter:
+    """
+    Buffers vapi_logs rows and inserts them in batches.
+
+    Usage:
+        vapi_log_writer.enqueue({"vapi_call_id": "...", "raw_log_data": {...}})
+        ...
+        await vapi_log_writer.drain()  # on shutdown
+    """
+
+    def __init__(self, batch_size: int = 50, flush_interval: float = 0.5):
+        """
+        Initialize the writer.
+
+        Args:
+            batch_size: Maximum rows sent in a single insert
+            flush_interval: Seconds to wait for more rows before flushing a partial batch
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def enqueue(self, log_data: Dict) -> None:
+        """
+        Queue a row for insertion without blocking the caller.
+
+        Args:
+            log_data: Column values for one vapi_logs row
+        """
+        self._ensure_consumer()
+        self._queue.put_nowait(log_data)
+
+    def _ensure_consumer(self) -> None:
+        """Start the flush task lazily on the running event loop"""
+        loop = asyncio.get_running_loop()
+
+        if self._loop is not loop:
+            # First use, or the previous loop is gone (e.g. test clients) -
+            # carry any unsent rows over to a queue bound to this loop
+            pending = self._take_pending()
+            self._queue = asyncio.Queue()
+            for row in pending:
+                self._queue.put_nowait(row)
+            self._loop = loop
+            self._task = None
+
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    def _take_pending(self) -> List[Dict]:
+        """Pop every queued row without waiting"""
+        rows = []
+        while self._queue is not None and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        return rows
+
+    async def _run(self) -> None:
+        """Collect up to batch_size rows or flush_interval seconds, then insert them"""
+        while True:
+            row = await self._queue.get()
+            if row is None:
+                return
+
+            batch = [row]
+            stopping = False
+            deadline = self._loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[Dict]) -> None:
+        """
+        Insert a batch of rows.
+
+        PostgREST takes the column list of a bulk insert from its first row,
+        so rows are grouped by their key set (interaction_type is optional).
+        """
+        groups: Dict[Tuple[str, ...], List[Dict]] = {}
+        for row in batch:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        try:
+            client = get_supabase_client()
+            for rows in groups.values():
+                response = await client.post(
+                    "/vapi_logs",
+                    headers=SUPABASE_WRITE_HEADERS,
+                    content=orjson.dumps(rows)
+                )
+
+                if response.status_code != 201:
+                    logger.error(f"Failed to log {len(rows)} VAPI interactions: {response.status_code} - {response.text}")
+
+        except Exception as e:
+            logger.error(f"Failed to log {len(batch)} VAPI interactions: {e}")
+
+    async def drain(self) -> None:
+        """Let the flush task finish its current batch, then write out everything still queued"""
+        if self._task is not None and not self._task.done() and self._loop is asyncio.get_running_loop():
+            # None is the stop sentinel for _run
+            self._queue.put_nowait(None)
+            await self._task
+        self._task = None
+
+        pending = [row for row in self._take_pending() if row is not None]
+        for start in range(0, len(pending), self.batch_size):
+            await self._flush(pending[start:start + self.batch_size])
+
+
+# Global writer instance
+vapi_log_writer = VapiLogWriter()
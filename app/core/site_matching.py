@@ -0,0 +1,262 @@
+"""
+Local fuzzy matching of spoken site descriptions to a tenant's sites
+
+Most callers say something close to a site's name, identifier or address,
+which can be matched in microseconds without an LLM round trip. Anything
+ambiguous is left for the caller to resolve (e.g. with OpenAI).
+"""
+
+from typing import Dict, List, Optional, Tuple
+import logging
+import re
+
+import orjson
+from rapidfuzz import fuzz
+
+from app.core.cache import TTLCache
+from app.core.supabase import SITES_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Score (0-100) a site must reach to be accepted without the LLM
+MATCH_THRESHOLD = 65
+# The best site must beat the runner-up by at least this much to be unambiguous
+AMBIGUITY_MARGIN = 5
+# Lower bar when the tenant only has one site to choose from
+SINGLE_SITE_THRESHOLD = 60
+# Addresses share generic words ("street", "road"), so they must match almost fully
+ADDRESS_MATCH_THRESHOLD = 90
+# A name or address word counts as said when a spoken word scores this against it
+TOKEN_MATCH_THRESHOLD = 85
+# Words of a multi-word name or address that must be said; one shared word is incidental
+MIN_MATCHED_TOKENS = 2
+# Shorter fragments (often speech-to-text noise) are never accepted locally
+MIN_QUERY_LENGTH = 3
+
+SITE_MATCH_FIELDS = ("name", "identifier", "address")
+
+# OpenAI structured output schema for matching a description to a site
+SITE_MATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "site_match",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "site_found": {"type": "boolean"},
+                "site_id": {"type": ["string", "null"]},
+                "site_name": {"type": ["string", "null"]},
+                "confidence": {"type": "string", "enum": ["high", "medium", "low"]}
+            },
+            "required": ["site_found", "site_id", "site_name", "confidence"],
+            "additionalProperties": False
+        }
+    }
+}
+
+
+# Instructions and the per-tenant site list form the system message, so repeat
+# calls for a tenant share a stable prefix (eligible for OpenAI prompt caching);
+# only the caller's words go in the user message
+SITE_MATCH_SYSTEM_PROMPT_TEMPLATE = """Match what the user said to one of these construction sites:
+{site_list}
+
+You MUST use the exact ID from the list above; the site_id MUST be the exact UUID, not a shortened version.
+If no site matches, set site_found to false and site_id and site_name to null."""
+
+SITE_LIST_LINE_TEMPLATE = "- ID: {id}, Name: {name}, Identifier: {identifier}, Address: {address}"
+
+# System prompt per tenant, paired with the cached sites list it was built from
+_site_match_system_prompts = TTLCache(maxsize=1024, ttl=SITES_CACHE_TTL_SECONDS)
+
+
+def site_match_system_prompt(tenant_id: str, sites: List[Dict]) -> str:
+    """
+    Get the site-match system prompt for a tenant.
+
+    Sites only change when the tenant's sites cache refreshes, so the prompt
+    is reused for as long as it was built from the same cached list.
+    """
+    cached = _site_match_system_prompts.get(tenant_id)
+    if cached and cached[0] is sites:
+        return cached[1]
+
+    site_list = "\n".join(
+        SITE_LIST_LINE_TEMPLATE.format(
+            id=site['id'],
+            name=site['name'],
+            identifier=site.get('identifier', 'None'),
+            address=site.get('address', 'None')
+        )
+        for site in sites
+    )
+    system_prompt = SITE_MATCH_SYSTEM_PROMPT_TEMPLATE.format(site_list=site_list)
+    _site_match_system_prompts.set(tenant_id, (sites, system_prompt))
+    return system_prompt
+
+
+def parse_site_match(openai_result: Dict) -> Optional[Dict]:
+    """
+    Read the site_match object from an OpenAI chat completion.
+
+    Structured outputs don't cover a refusal (content is null) or a reply
+    cut off at max_tokens (truncated JSON), so those are checked here.
+
+    Args:
+        openai_result: Parsed /chat/completions response requested with SITE_MATCH_RESPONSE_FORMAT
+
+    Returns:
+        The site_match dict, or None if the model gave no usable answer
+    """
+    choice = openai_result["choices"][0]
+    message = choice["message"]
+
+    if message.get("refusal"):
+        logger.error(f"OpenAI refused site matching: {message['refusal']}")
+        return None
+
+    if choice.get("finish_reason") == "length":
+        logger.error(f"OpenAI site match was truncated: {message.get('content')}")
+        return None
+
+    try:
+        return orjson.loads(message["content"])
+    except (orjson.JSONDecodeError, TypeError) as e:
+        logger.error(f"JSON parsing error: {e}. Response was: {message.get('content')}")
+        return None
+
+
+def _tokens(text: str) -> List[str]:
+    """Lowercase alphanumeric words of text"""
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+
+def _coverage_score(query_tokens: List[str], field_tokens: List[str]) -> float:
+    """
+    Score how much of a site field the caller said.
+
+    Each field word takes its best fuzz.ratio against the spoken words and
+    counts if it reaches TOKEN_MATCH_THRESHOLD. The score is the sum of those
+    over all field words, so a description must cover the field, not just
+    share a word with it.
+
+    Returns:
+        0-100, or 0 if fewer than MIN_MATCHED_TOKENS field words were said
+    """
+    if not query_tokens or not field_tokens:
+        return 0
+
+    matched = []
+    for field_token in field_tokens:
+        best = max(fuzz.ratio(field_token, query_token) for query_token in query_tokens)
+        if best >= TOKEN_MATCH_THRESHOLD:
+            matched.append(best)
+
+    if len(matched) < min(len(field_tokens), MIN_MATCHED_TOKENS):
+        return 0
+    return sum(matched) / len(field_tokens)
+
+
+def _identifier_score(query_tokens: List[str], identifier: str) -> float:
+    """Score an identifier (e.g. "MSR-01") said on its own or within a description"""
+    identifier_tokens = _tokens(identifier)
+    if not identifier_tokens:
+        return 0
+
+    # Said as written ("msr 01") or run together ("msr01")
+    size = len(identifier_tokens)
+    compact = "".join(identifier_tokens)
+    if compact in query_tokens or any(
+        query_tokens[i:i + size] == identifier_tokens for i in range(len(query_tokens) - size + 1)
+    ):
+        return 100
+
+    return fuzz.ratio(compact, "".join(query_tokens))
+
+
+def score_sites(description: str, sites: List[Dict]) -> List[Tuple[float, Dict]]:
+    """
+    Score every site against a description.
+
+    Each site scores the best of its name coverage, its identifier and its
+    address coverage. Addresses only count above ADDRESS_MATCH_THRESHOLD, so
+    a shared street word alone can't pick a site.
+
+    Args:
+        description: What the caller said about the site
+        sites: Site rows with name, identifier and address
+
+    Returns:
+        (score, site) pairs, best first
+    """
+    query_tokens = _tokens(description)
+    scored = []
+    for site in sites:
+        address_score = _coverage_score(query_tokens, _tokens(site.get("address") or ""))
+        score = max(
+            _coverage_score(query_tokens, _tokens(site.get("name") or "")),
+            _identifier_score(query_tokens, site.get("identifier") or ""),
+            address_score if address_score >= ADDRESS_MATCH_THRESHOLD else 0
+        )
+        scored.append((score, site))
+
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    return scored
+
+
+def substring_match_site(description: str, sites: List[Dict]) -> Optional[Dict]:
+    """
+    Match a description contained in exactly one site's name, identifier or address.
+
+    This is the local equivalent of an ilike *description* filter across the
+    match fields; it is exact, so it runs before any fuzzy scoring.
+
+    Args:
+        description: What the caller said about the site
+        sites: Site rows with name, identifier and address
+
+    Returns:
+        The only site containing the description, or None if zero or several do
+    """
+    query = description.strip().lower()
+    if len(query) < MIN_QUERY_LENGTH:
+        return None
+
+    matches = [
+        site for site in sites
+        if any(query in str(site[field]).lower() for field in SITE_MATCH_FIELDS if site.get(field))
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+def fuzzy_match_site(description: str, sites: List[Dict]) -> Optional[Dict]:
+    """
+    Match a description to a site when the answer is unambiguous.
+
+    Args:
+        description: What the caller said about the site
+        sites: Site rows with id, name, identifier and address
+
+    Returns:
+        The matching site row, or None if no single site is a confident match
+    """
+    if not description or len(description.strip()) < MIN_QUERY_LENGTH or not sites:
+        return None
+
+    substring_match = substring_match_site(description, sites)
+    if substring_match:
+        return substring_match
+
+    scored = score_sites(description, sites)
+    best_score, best_site = scored[0]
+
+    if len(scored) == 1:
+        return best_site if best_score >= SINGLE_SITE_THRESHOLD else None
+
+    # Two close candidates (e.g. "Main Street North" vs "Main Street South") is ambiguous
+    runner_up_score = scored[1][0]
+    if best_score >= MATCH_THRESHOLD and best_score - runner_up_score >= AMBIGUITY_MARGIN:
+        return best_site
+
+    return None
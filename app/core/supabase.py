@@ -0,0 +1,265 @@
+"""
+Cached Supabase lookups shared by the skill endpoints
+
+Reads that many webhook calls repeat (e.g. a tenant's active sites) are
+served from short-lived in-process caches in front of PostgREST.
+"""
+
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+import logging
+
+import orjson
+
+from app.core.cache import TTLCache
+from app.core.http import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+SITES_CACHE_TTL_SECONDS = 300  # Site changes can be pushed sooner via invalidate_tenant_sites()
+SESSION_CACHE_TTL_SECONDS = 1800  # Covers the assistant's maxDurationSeconds, so one lookup per call
+TENANT_NAME_CACHE_TTL_SECONDS = 3600  # Company renames are rare and only affect spoken replies
+
+_sites_cache = TTLCache(maxsize=1024, ttl=SITES_CACHE_TTL_SECONDS)
+_session_cache = TTLCache(maxsize=4096, ttl=SESSION_CACHE_TTL_SECONDS)
+_tenant_name_cache = TTLCache(maxsize=4096, ttl=TENANT_NAME_CACHE_TTL_SECONDS)
+# {site_id: site} per tenant, paired with the cached sites list it indexes
+_site_index_cache = TTLCache(maxsize=1024, ttl=SITES_CACHE_TTL_SECONDS)
+
+
+async def get_session_context_by_call_id(vapi_call_id: str) -> Optional[Dict]:
+    """
+    Get session context from vapi_logs using call ID.
+
+    Every tool call in a VAPI call needs the same context, so it is cached per
+    call ID and concurrent lookups share one request.
+
+    Args:
+        vapi_call_id: VAPI call identifier
+
+    Returns:
+        Dict with tenant_id, user_id, caller_phone, user_name and tenant_name,
+        or None if the caller hasn't authenticated on this call
+    """
+    return await _session_cache.get_or_load(vapi_call_id, lambda: _fetch_session_context(vapi_call_id))
+
+
+def remember_session_context(vapi_call_id: str, session_context: Dict) -> None:
+    """
+    Prime the session cache right after authentication.
+
+    The authentication log row is written asynchronously, so this lets the
+    next tool call in the same call find its context without waiting for it.
+
+    Args:
+        vapi_call_id: VAPI call identifier
+        session_context: Same shape as returned by get_session_context_by_call_id
+    """
+    _session_cache.set(vapi_call_id, session_context)
+    _prime_tenant_name(session_context["tenant_id"], session_context.get("tenant_name"))
+
+
+async def _fetch_session_context(vapi_call_id: str) -> Optional[Dict]:
+    """Look up the authentication log entry for a call"""
+    try:
+        client = get_supabase_client()
+        response = await client.get(
+            "/vapi_logs",
+            params={
+                "vapi_call_id": f"eq.{vapi_call_id}",
+                "interaction_type": "eq.authentication",
+                "select": "tenant_id,user_id,caller_phone,raw_log_data,created_at",
+                "limit": "1",
+                "order": "created_at.desc"
+            }
+        )
+
+        if response.status_code == 200:
+            logs = orjson.loads(response.content)
+            if logs:
+                log_entry = logs[0]
+                _prime_sites_from_auth_log(log_entry["tenant_id"], log_entry["raw_log_data"], log_entry.get("created_at"))
+                _prime_tenant_name(log_entry["tenant_id"], log_entry["raw_log_data"].get("tenant_name"))
+                return {
+                    "tenant_id": log_entry["tenant_id"],
+                    "user_id": log_entry["user_id"],
+                    "caller_phone": log_entry["caller_phone"],
+                    "user_name": log_entry["raw_log_data"].get("user_name"),
+                    "tenant_name": log_entry["raw_log_data"].get("tenant_name")
+                }
+
+        logger.warning(f"No session context found for call ID: {vapi_call_id}")
+        return None
+
+    except Exception as e:
+        logger.error(f"Error getting session context for call {vapi_call_id}: {str(e)}")
+        return None
+
+
+async def get_tenant_name(tenant_id: str) -> Optional[str]:
+    """
+    Get a tenant's company name, cached per tenant.
+
+    Args:
+        tenant_id: Tenant UUID
+
+    Returns:
+        The tenant's name, or None if the lookup failed (failures aren't cached)
+    """
+    return await _tenant_name_cache.get_or_load(tenant_id, lambda: _fetch_tenant_name(tenant_id))
+
+
+def _prime_tenant_name(tenant_id: str, tenant_name: Optional[str]) -> None:
+    """
+    Seed the tenant name cache from a session context.
+
+    Authentication already knows the tenant's name, so the tool calls that
+    follow it don't need their own /tenants lookup.
+    """
+    if tenant_name and tenant_id not in _tenant_name_cache:
+        _tenant_name_cache.set(tenant_id, tenant_name)
+
+
+async def _fetch_tenant_name(tenant_id: str) -> Optional[str]:
+    """Fetch a tenant's name from Supabase"""
+    try:
+        client = get_supabase_client()
+        response = await client.get(
+            "/tenants",
+            params={
+                "id": f"eq.{tenant_id}",
+                "select": "name"
+            }
+        )
+
+        if response.status_code == 200:
+            tenants = orjson.loads(response.content)
+            if tenants:
+                return tenants[0]["name"]
+
+        logger.warning(f"No tenant name found for tenant {tenant_id}: {response.status_code}")
+        return None
+
+    except Exception as e:
+        logger.error(f"Error getting tenant name for {tenant_id}: {str(e)}")
+        return None
+
+
+def invalidate_tenant_sites(tenant_id: str) -> None:
+    """
+    Forget a tenant's cached sites so the next lookup refetches them.
+
+    Args:
+        tenant_id: Tenant UUID
+    """
+    _sites_cache.pop(tenant_id)
+    _site_index_cache.pop(tenant_id)
+
+
+def _prime_sites_from_auth_log(tenant_id: str, raw_log_data: Dict, logged_at: Optional[str]) -> None:
+    """
+    Seed the sites cache from an authentication log entry.
+
+    Authentication logs the tenant's sites, so a cold session lookup also
+    answers the sites lookup that usually follows it, saving a sequential
+    round trip. Fresher cached sites are never overwritten, and the snapshot
+    only lives out what is left of the sites TTL since it was logged. An
+    empty list is skipped, since authentication also logs that when its own
+    sites lookup failed.
+    """
+    available_sites = raw_log_data.get("available_sites")
+    if not available_sites or not logged_at or tenant_id in _sites_cache:
+        return
+
+    try:
+        age = (datetime.now(timezone.utc) - datetime.fromisoformat(logged_at)).total_seconds()
+    except (TypeError, ValueError):
+        return
+
+    remaining = SITES_CACHE_TTL_SECONDS - age
+    if remaining <= 0:
+        return
+
+    _sites_cache.set(tenant_id, [
+        {
+            "id": site["site_id"],
+            "name": site["site_name"],
+            "identifier": site.get("site_identifier"),
+            "address": site.get("site_address")
+        }
+        for site in available_sites
+    ], ttl=remaining)
+
+
+async def get_tenant_sites(tenant_id: str) -> Optional[List[Dict]]:
+    """
+    Get a tenant's active sites, cached per tenant for a short TTL.
+
+    Args:
+        tenant_id: Tenant UUID
+
+    Returns:
+        List of site rows (id, name, identifier, address), or None if the lookup failed
+    """
+    return await _sites_cache.get_or_load(tenant_id, lambda: _fetch_tenant_sites(tenant_id))
+
+
+def index_tenant_sites(tenant_id: str, sites: List[Dict]) -> Dict[str, Dict]:
+    """
+    Get a tenant's sites keyed by id.
+
+    The index is built once per cached sites list, so repeated lookups by
+    site ID are dict hits rather than scans.
+
+    Args:
+        tenant_id: Tenant UUID
+        sites: Sites list as returned by get_tenant_sites
+
+    Returns:
+        Dict of site_id -> site row
+    """
+    cached = _site_index_cache.get(tenant_id)
+    if cached and cached[0] is sites:
+        return cached[1]
+
+    sites_by_id = {site["id"]: site for site in sites}
+    _site_index_cache.set(tenant_id, (sites, sites_by_id))
+    return sites_by_id
+
+
+async def get_tenant_site(tenant_id: str, site_id: str) -> Optional[Dict]:
+    """
+    Get one of a tenant's active sites by ID.
+
+    Args:
+        tenant_id: Tenant UUID
+        site_id: Site (entity) UUID
+
+    Returns:
+        The site row, or None if it isn't an active site of this tenant
+    """
+    sites = await get_tenant_sites(tenant_id)
+    if not sites:
+        return None
+
+    return index_tenant_sites(tenant_id, sites).get(site_id)
+
+
+async def _fetch_tenant_sites(tenant_id: str) -> Optional[List[Dict]]:
+    """Fetch a tenant's active sites from Supabase"""
+    client = get_supabase_client()
+    response = await client.get(
+        "/entities",
+        params={
+            "tenant_id": f"eq.{tenant_id}",
+            "entity_type": "eq.sites",
+            "is_active": "eq.true",
+            "select": "id,name,identifier,address"
+        }
+    )
+
+    if response.status_code != 200:
+        logger.error(f"Failed to fetch sites for tenant {tenant_id}: {response.status_code} - {response.text}")
+        return None
+
+    return orjson.loads(response.content)
@@ -2,8 +2,11 @@
 
 from fastapi import FastAPI, HTTPException, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import asyncio
 import httpx
 import os
 from datetime import datetime
@@ -12,6 +15,7 @@ import uuid
 from datetime import datetime, date
 import logging
 import json
+from contextlib import asynccontextmanager
 from app.vapi_voice_notes import VoiceNotesVAPISystem, add_voice_notes_management_endpoints, VAPIConfig
 from app.vapi_tools_setup import VAPIToolsManager
 from app.vapi_utils import vapi_tool, extract_vapi_args
@@ -22,7 +26,10 @@ from app.skills import skill_registry
 from app.skills.voice_notes import VoiceNotesSkill
 from app.skills.authentication import AuthenticationSkill
 from app.skills.site_updates import SiteUpdatesSkill
+from app.skills.site_updates.endpoints import sweep_stale_updates
 from app.assistants import GreeterAssistant, JillVoiceNotesAssistant, SiteProgressAssistant
+from app.core.log_writer import vapi_log_writer
+from app.core.http import close_http_clients
 
 # Load environment variables from .env file
 load_dotenv()
@@ -31,7 +38,23 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Multi-Tenant Document RAG + VAPI Skills System", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Sweep for orphaned site updates while running; flush logs and close the shared HTTP clients on shutdown"""
+    stale_update_sweep = asyncio.create_task(sweep_stale_updates())
+    yield
+    stale_update_sweep.cancel()
+    await vapi_log_writer.drain()
+    await close_http_clients()
+
+
+app = FastAPI(
+    title="Multi-Tenant Document RAG + VAPI Skills System",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 # ============================================
 # NEW SKILL-BASED ARCHITECTURE
@@ -92,6 +115,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON bodies (e.g. get-updates with summaries); small VAPI tool replies are left as-is
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 
 # ============================================
 # MODELS
@@ -720,7 +746,7 @@ async def authenticate_by_phone(request: dict):
                 })
             
             # Generate greeting
-            first_name = user['name'].split()[0] if user['name'] else "there"
+            first_name = user['name'].strip().partition(' ')[0] if user.get('name') else "there"
             
             if len(available_skills) == 1:
                 greeting = f"Hi {first_name}! Ready for voice notes? Let me connect you right away."
@@ -1464,7 +1490,7 @@ async def handle_internal_user_auth(auth_result: Dict, intent: Optional[str]) ->
     user_data = auth_result["user_data"]
     user_name = user_data["name"]
     user_role = user_data["role"]
-    first_name = user_name.split()[0]
+    first_name = user_name.strip().partition(' ')[0]
     
     # Process available skills
     skills_data = user_data.get("skills") or []
@@ -5,52 +5,89 @@ Handles authentication-related webhook endpoints for VAPI.
 """
 
 from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from functools import lru_cache
+import asyncio
 import logging
 import httpx
 import os
 
+import orjson
+
 from app.vapi_utils import extract_vapi_args
-from app.config import settings
+from app.core.cache import TTLCache
+from app.core.http import get_supabase_client
+from app.core.log_writer import vapi_log_writer
+from app.core.supabase import get_tenant_sites, remember_session_context
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Numbers recently looked up with no active user (spam, wrong numbers).
+# Kept short-lived so newly provisioned users can authenticate within a minute.
+UNKNOWN_PHONE_TTL_SECONDS = 60
+_unknown_phones = TTLCache(maxsize=10000, ttl=UNKNOWN_PHONE_TTL_SECONDS)
+
 
 # Helper function to log VAPI interactions
-async def log_vapi_interaction(vapi_call_id: str, interaction_type: str = None,
-                                user_id: str = None, tenant_id: str = None,
-                                caller_phone: str = None, details: dict = None):
-    """Log VAPI interactions for debugging and audit"""
+def log_vapi_interaction(vapi_call_id: str, interaction_type: str = None,
+                         user_id: str = None, tenant_id: str = None,
+                         caller_phone: str = None, details: dict = None):
+    """Queue a VAPI interaction for the batched audit log (never blocks the caller)"""
+    log_data = {
+        "vapi_call_id": vapi_call_id,
+        "user_id": user_id,
+        "tenant_id": tenant_id,
+        "caller_phone": caller_phone,
+        "raw_log_data": details or {},
+    }
+
+    if interaction_type:
+        log_data["interaction_type"] = interaction_type
+
     try:
-        async with httpx.AsyncClient() as client:
-            log_data = {
-                "vapi_call_id": vapi_call_id,
-                "user_id": user_id,
-                "tenant_id": tenant_id,
-                "caller_phone": caller_phone,
-                "raw_log_data": details or {},
-            }
+        vapi_log_writer.enqueue(log_data)
+    except Exception as e:
+        logger.error(f"Failed to log VAPI interaction: {e}")
 
-            if interaction_type:
-                log_data["interaction_type"] = interaction_type
 
-            response = await client.post(
-                f"{settings.SUPABASE_URL}/rest/v1/vapi_logs",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                json=log_data
-            )
+def _embedded_count(rows: Optional[list]) -> Optional[int]:
+    """Read a PostgREST embedded `(count)` aggregate, or None if it wasn't returned"""
+    if isinstance(rows, list) and rows and isinstance(rows[0], dict):
+        return rows[0].get('count')
+    return None
 
-            if response.status_code != 201:
-                logger.error(f"Failed to log VAPI interaction: {response.status_code} - {response.text}")
 
-    except Exception as e:
-        logger.error(f"Failed to log VAPI interaction: {e}")
+async def _fetch_user_skills(client: httpx.AsyncClient, user_id: str) -> List[Dict]:
+    """Get the enabled skills for a user"""
+    response = await client.get(
+        "/user_skills",
+        params={
+            "user_id": f"eq.{user_id}",
+            "is_enabled": "eq.true",
+            "select": "skills(skill_key,name,description,vapi_assistant_id)"
+        }
+    )
+    return orjson.loads(response.content) if response.status_code == 200 else []
+
+
+async def _no_rows() -> List[Dict]:
+    """Stand-in for a lookup that is known to return nothing"""
+    return []
+
+
+@lru_cache(maxsize=2048)
+def make_greeting(first_name: str, skill_names: Tuple[str, ...]) -> str:
+    """Build the spoken greeting for a caller and the skills they can use"""
+    if len(skill_names) == 0:
+        return f"Hi {first_name}! I don't have any skills configured for you yet. Please contact support."
+    if len(skill_names) == 1:
+        return f"Hi {first_name}! Ready for {skill_names[0]}? Let's get started."
+    if len(skill_names) == 2:
+        return f"Hi {first_name}! I can help you with {skill_names[0]} or {skill_names[1]}. What would you like to do?"
+
+    skills_text = f"{', '.join(skill_names[:-1])}, or {skill_names[-1]}"
+    return f"Hi {first_name}! I can help you with {skills_text}. What would you like to do?"
 
 
 @router.post("/api/v1/vapi/authenticate-by-phone")
@@ -58,18 +95,13 @@ async def authenticate_by_phone(request: dict):
     """Authenticate caller by phone number - VAPI Server Tool format"""
 
     # Extract call ID and phone from VAPI request structure
-    vapi_call_id = None
-    caller_phone = None
-
-    if "message" in request and "call" in request["message"]:
-        call_data = request["message"]["call"]
-        vapi_call_id = call_data.get("id")
+    # VAPI provides customer.number in the call object
+    call_data = (request.get("message") or {}).get("call") or {}
+    vapi_call_id = call_data.get("id")
+    caller_phone = (call_data.get("customer") or {}).get("number")
 
-        # Try to get phone from call metadata
-        # VAPI provides customer.number in the call object
-        if "customer" in call_data and "number" in call_data["customer"]:
-            caller_phone = call_data["customer"]["number"]
-            logger.info(f"Extracted phone from VAPI call metadata: {caller_phone}")
+    if caller_phone:
+        logger.info("Extracted phone from VAPI call metadata: %s", caller_phone)
 
     tool_call_id, args = extract_vapi_args(request)
 
@@ -88,7 +120,7 @@ async def authenticate_by_phone(request: dict):
             test_phone = os.getenv("TEST_DEFAULT_PHONE")
             if test_phone:
                 caller_phone = test_phone
-                logger.info(f"No phone in call metadata or args, using test default: {caller_phone}")
+                logger.info("No phone in call metadata or args, using test default: %s", caller_phone)
             else:
                 logger.error("No phone number provided and TEST_DEFAULT_PHONE not set")
                 return {
@@ -101,164 +133,158 @@ async def authenticate_by_phone(request: dict):
                     }]
                 }
 
-        logger.info(f"Authenticating phone: {caller_phone}, call: {vapi_call_id}, toolCallId: {tool_call_id}")
+        logger.info("Authenticating phone: %s, call: %s, toolCallId: %s", caller_phone, vapi_call_id, tool_call_id)
 
-        # Authenticate user
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/users",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params={
-                    "phone_number": f"eq.{caller_phone}",
-                    "is_active": "eq.true",
-                    "select": "id,name,phone_number,tenant_id,tenants(name)"
-                }
-            )
-
-            if response.status_code != 200:
-                logger.error(f"Supabase error: {response.status_code}")
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "authorized": False,
-                            "message": "System error during authentication"
-                        }
-                    }]
-                }
+        if caller_phone in _unknown_phones:
+            logger.info("Phone number recently not found, skipping lookup")
+            return {
+                "results": [{
+                    "toolCallId": tool_call_id,
+                    "result": {
+                        "authorized": False,
+                        "message": "Phone number not found or not authorized"
+                    }
+                }]
+            }
 
-            users = response.json()
-            if not users:
-                logger.info("No users found for phone number")
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "authorized": False,
-                            "message": "Phone number not found or not authorized"
-                        }
-                    }]
-                }
+        # Authenticate user
+        client = get_supabase_client()
+        response = await client.get(
+            "/users",
+            params={
+                "phone_number": f"eq.{caller_phone}",
+                "is_active": "eq.true",
+                # Embedded counts let us skip the skills/sites queries when they would be empty
+                "select": "id,name,phone_number,role,tenant_id,tenants(name,entities(count)),user_skills(count)",
+                "user_skills.is_enabled": "eq.true",
+                "tenants.entities.entity_type": "eq.sites",
+                "tenants.entities.is_active": "eq.true"
+            }
+        )
 
-            user = users[0]
-            logger.info(f"Found user: {user}")
-
-            # Note: Log will be updated after we fetch skills and sites
-
-            # Get skills
-            skills_response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/user_skills",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params={
-                    "user_id": f"eq.{user['id']}",
-                    "is_enabled": "eq.true",
-                    "select": "skills(skill_key,name,description,vapi_assistant_id)"
-                }
-            )
-
-            user_skills = skills_response.json() if skills_response.status_code == 200 else []
-            available_skills = []
-            for user_skill in user_skills:
-                skill = user_skill.get('skills', {})
-                available_skills.append({
-                    "skill_key": skill.get('skill_key'),
-                    "skill_name": skill.get('name'),
-                    "skill_description": skill.get('description', skill.get('name')),
-                    "vapi_assistant_id": skill.get('vapi_assistant_id')
-                })
-
-            # Get all active sites for this tenant
-            sites_response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/entities",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params={
-                    "tenant_id": f"eq.{user['tenant_id']}",
-                    "entity_type": "eq.sites",
-                    "is_active": "eq.true",
-                    "select": "id,name,identifier,address"
-                }
-            )
-
-            available_sites = []
-            if sites_response.status_code == 200:
-                sites = sites_response.json()
-                for site in sites:
-                    available_sites.append({
-                        "site_id": site['id'],
-                        "site_name": site['name'],
-                        "site_identifier": site.get('identifier'),
-                        "site_address": site.get('address')
-                    })
-
-            # Generate greeting
-            first_name = user['name'].split()[0] if user['name'] else "there"
-
-            if len(available_skills) == 0:
-                greeting = f"Hi {first_name}! I don't have any skills configured for you yet. Please contact support."
-            elif len(available_skills) == 1:
-                skill_name = available_skills[0].get('skill_name', 'Unknown')
-                greeting = f"Hi {first_name}! Ready for {skill_name}? Let's get started."
-            else:
-                skill_names = [skill.get('skill_name', 'Unknown') for skill in available_skills]
-                if len(skill_names) == 2:
-                    greeting = f"Hi {first_name}! I can help you with {skill_names[0]} or {skill_names[1]}. What would you like to do?"
-                else:
-                    skills_text = ", ".join(skill_names[:-1]) + f", or {skill_names[-1]}"
-                    greeting = f"Hi {first_name}! I can help you with {skills_text}. What would you like to do?"
-
-            logger.info(f"Successfully authenticated {user['name']} with {len(available_skills)} skills and {len(available_sites)} sites")
-
-            # Log this authentication with full context for session
-            await log_vapi_interaction(
-                vapi_call_id=vapi_call_id,
-                interaction_type="authentication",
-                user_id=user['id'],
-                tenant_id=user['tenant_id'],
-                caller_phone=caller_phone,
-                details={
-                    "user_name": user['name'],
-                    "user_role": user.get('role'),
-                    "tenant_name": user['tenants']['name'],
-                    "tenant_id": user['tenant_id'],
-                    "auth_success": True,
-                    "available_skills": available_skills,
-                    "available_sites": available_sites,
-                    "site_count": len(available_sites)
-                }
-            )
+        if response.status_code != 200:
+            logger.error(f"Supabase error: {response.status_code}")
+            return {
+                "results": [{
+                    "toolCallId": tool_call_id,
+                    "result": {
+                        "authorized": False,
+                        "message": "System error during authentication"
+                    }
+                }]
+            }
 
-            # Return VAPI-compatible response with enriched context
+        users = orjson.loads(response.content)
+        if not users:
+            logger.info("No users found for phone number")
+            _unknown_phones.set(caller_phone, True)
             return {
                 "results": [{
                     "toolCallId": tool_call_id,
                     "result": {
-                        "authorized": True,
-                        "user_id": user['id'],
-                        "user_name": user['name'],
-                        "first_name": first_name,
-                        "user_role": user.get('role', 'user'),
-                        "tenant_id": user['tenant_id'],
-                        "tenant_name": user['tenants']['name'],
-                        "phone_number": user['phone_number'],
-                        "greeting_message": greeting,
-                        "available_skills": available_skills,
-                        "skill_count": len(available_skills),
-                        "single_skill_mode": len(available_skills) == 1,
-                        "available_sites": available_sites,
-                        "site_count": len(available_sites)
+                        "authorized": False,
+                        "message": "Phone number not found or not authorized"
                     }
                 }]
             }
 
+        user = users[0]
+        logger.info("Found user: %s", user)
+
+        # Note: Log will be updated after we fetch skills and sites
+
+        skill_count = _embedded_count(user.get('user_skills'))
+        site_count = _embedded_count((user.get('tenants') or {}).get('entities'))
+
+        # Get skills and sites concurrently. Sites go through the shared
+        # per-tenant cache, so the site_updates tools that follow this call
+        # find them already loaded.
+        user_skills, sites = await asyncio.gather(
+            _fetch_user_skills(client, user['id']) if skill_count != 0 else _no_rows(),
+            get_tenant_sites(user['tenant_id']) if site_count != 0 else _no_rows()
+        )
+
+        available_skills = []
+        for user_skill in user_skills:
+            skill = user_skill.get('skills', {})
+            available_skills.append({
+                "skill_key": skill.get('skill_key'),
+                "skill_name": skill.get('name'),
+                "skill_description": skill.get('description', skill.get('name')),
+                "vapi_assistant_id": skill.get('vapi_assistant_id')
+            })
+
+        available_sites = []
+        for site in sites or []:
+            available_sites.append({
+                "site_id": site['id'],
+                "site_name": site['name'],
+                "site_identifier": site.get('identifier'),
+                "site_address": site.get('address')
+            })
+
+        # Generate greeting
+        first_name = user['name'].strip().partition(' ')[0] if user.get('name') else "there"
+
+        greeting = make_greeting(
+            first_name,
+            tuple(skill.get('skill_name', 'Unknown') for skill in available_skills)
+        )
+
+        logger.info("Successfully authenticated %s with %s skills and %s sites", user['name'], len(available_skills), len(available_sites))
+
+        # Log this authentication with full context for session
+        log_vapi_interaction(
+            vapi_call_id=vapi_call_id,
+            interaction_type="authentication",
+            user_id=user['id'],
+            tenant_id=user['tenant_id'],
+            caller_phone=caller_phone,
+            details={
+                "user_name": user['name'],
+                "user_role": user.get('role'),
+                "tenant_name": user['tenants']['name'],
+                "tenant_id": user['tenant_id'],
+                "auth_success": True,
+                "available_skills": available_skills,
+                "available_sites": available_sites,
+                "site_count": len(available_sites)
+            }
+        )
+
+        # The log row is written in the background, so hand the session
+        # straight to the cache used by the other skills' tool calls
+        remember_session_context(vapi_call_id, {
+            "tenant_id": user['tenant_id'],
+            "user_id": user['id'],
+            "caller_phone": caller_phone,
+            "user_name": user['name'],
+            "tenant_name": user['tenants']['name']
+        })
+
+        # Return VAPI-compatible response with enriched context
+        return {
+            "results": [{
+                "toolCallId": tool_call_id,
+                "result": {
+                    "authorized": True,
+                    "user_id": user['id'],
+                    "user_name": user['name'],
+                    "first_name": first_name,
+                    "user_role": user.get('role', 'user'),
+                    "tenant_id": user['tenant_id'],
+                    "tenant_name": user['tenants']['name'],
+                    "phone_number": user['phone_number'],
+                    "greeting_message": greeting,
+                    "available_skills": available_skills,
+                    "skill_count": len(available_skills),
+                    "single_skill_mode": len(available_skills) == 1,
+                    "available_sites": available_sites,
+                    "site_count": len(available_sites)
+                }
+            }]
+        }
+
     except Exception as e:
         logger.error(f"Authentication error: {e}")
         return {
@@ -6,12 +6,44 @@ This ensures consistent structure and makes adding new skills straightforward.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 from fastapi import FastAPI
+import asyncio
+import httpx
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of concurrent tool creation requests sent to VAPI
+TOOL_CREATE_CONCURRENCY = 8
+
+# In-flight VAPI tool listings keyed by (API base URL, Authorization header).
+# setup_all() creates every skill's tools concurrently and each skill needs
+# the same account-wide listing, so overlapping requests share one GET.
+# Entries are dropped as soon as the listing completes, so later setups
+# always see tools created since.
+_tool_listings: Dict[Tuple[str, str], "asyncio.Future[Dict[str, str]]"] = {}
+
+
+async def _list_vapi_tools(vapi_base_url: str, headers: Dict) -> Dict[str, str]:
+    """Get the account's VAPI tools as a map of function name to tool ID"""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            f"{vapi_base_url}/tool",
+            headers=headers
+        )
+
+        if response.status_code == 200:
+            tools = response.json()
+            tool_map = {}
+            for tool in tools:
+                if tool.get('function', {}).get('name'):
+                    tool_map[tool['function']['name']] = tool['id']
+            return tool_map
+        else:
+            logger.warning(f"Failed to get existing tools: {response.status_code}")
+            return {}
+
 
 class BaseSkill(ABC):
     """
@@ -23,6 +55,10 @@ class BaseSkill(ABC):
     - register_routes(): Register FastAPI endpoints for the skill
     """
 
+    # Bumped whenever any skill's tool_ids or assistant_id change, so views
+    # derived from skills (e.g. the registry's squad list) know to rebuild
+    state_version = 0
+
     def __init__(self, skill_key: str, name: str, description: str):
         """
         Initialize a skill.
@@ -35,11 +71,110 @@ class BaseSkill(ABC):
         self.skill_key = skill_key
         self.name = name
         self.description = description
+        self._info_cache: Optional[Dict[str, Any]] = None
         self.tool_ids: Dict[str, str] = {}
         self.assistant_id: Optional[str] = None
 
         logger.info(f"Initialized skill: {self.name} ({self.skill_key})")
 
+    @property
+    def tool_ids(self) -> Dict[str, str]:
+        return self._tool_ids
+
+    @tool_ids.setter
+    def tool_ids(self, value: Dict[str, str]):
+        self._tool_ids = value
+        self._info_cache = None
+        BaseSkill.state_version += 1
+
+    @property
+    def assistant_id(self) -> Optional[str]:
+        return self._assistant_id
+
+    @assistant_id.setter
+    def assistant_id(self, value: Optional[str]):
+        self._assistant_id = value
+        self._info_cache = None
+        BaseSkill.state_version += 1
+
+    async def _get_existing_tools(self, headers: Dict) -> Dict[str, str]:
+        """
+        Get existing tools to avoid duplicates
+
+        Concurrent calls for the same VAPI account share one request; treat
+        the returned map as read-only.
+        """
+        key = (self.vapi_base_url, headers["Authorization"])
+        listing = _tool_listings.get(key)
+        if listing is None:
+            listing = asyncio.ensure_future(_list_vapi_tools(self.vapi_base_url, headers))
+            _tool_listings[key] = listing
+            listing.add_done_callback(lambda _: _tool_listings.pop(key, None))
+
+        # Shielded so one cancelled caller doesn't cancel the shared request
+        return await asyncio.shield(listing)
+
+    async def _create_vapi_tools(self, tools_config: Dict[str, Dict], headers: Dict) -> Dict[str, str]:
+        """
+        Create the given VAPI tools, reusing any that already exist
+
+        Missing tools are created concurrently. If any creation fails the
+        first error is raised; tools created before it are picked up by
+        _get_existing_tools() on the next setup.
+
+        Args:
+            tools_config: Dict mapping tool names to their VAPI tool configs
+            headers: VAPI request headers
+
+        Returns:
+            Dict mapping tool names to their VAPI tool IDs
+        """
+        tool_ids = {}
+
+        # Check for existing tools first
+        existing_tools = await self._get_existing_tools(headers)
+
+        # Reuse tools that already exist, create the rest concurrently
+        to_create = {}
+        for tool_name, tool_config in tools_config.items():
+            if tool_name in existing_tools:
+                tool_ids[tool_name] = existing_tools[tool_name]
+                logger.info(f"Using existing tool: {tool_name} ({tool_ids[tool_name]})")
+            else:
+                to_create[tool_name] = tool_config
+
+        semaphore = asyncio.Semaphore(TOOL_CREATE_CONCURRENCY)
+
+        async with httpx.AsyncClient() as client:
+            async def create_one(tool_name: str, tool_config: Dict) -> str:
+                async with semaphore:
+                    response = await client.post(
+                        f"{self.vapi_base_url}/tool",
+                        headers=headers,
+                        json=tool_config
+                    )
+
+                if response.status_code == 201:
+                    tool = response.json()
+                    logger.info(f"Created tool: {tool_name} ({tool['id']})")
+                    return tool['id']
+
+                logger.error(f"Failed to create tool {tool_name}: {response.status_code} - {response.text}")
+                raise Exception(f"Tool creation failed for {tool_name}: {response.text}")
+
+            # Let every request finish before the client closes
+            results = await asyncio.gather(
+                *(create_one(name, config) for name, config in to_create.items()),
+                return_exceptions=True
+            )
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        tool_ids.update(zip(to_create, results))
+        return tool_ids
+
     @abstractmethod
     async def create_tools(self) -> Dict[str, str]:
         """
@@ -99,19 +234,24 @@ class BaseSkill(ABC):
             "assistant_id": self.assistant_id
         }
 
-    def get_info(self) -> Dict[str, any]:
+    def get_info(self) -> Dict[str, Any]:
         """
         Get information about this skill.
 
+        The result is cached until tool_ids or assistant_id is reassigned
+        (e.g. during setup()), so treat the returned dict as read-only.
+
         Returns:
             Dictionary with skill metadata
         """
-        return {
-            "skill_key": self.skill_key,
-            "name": self.name,
-            "description": self.description,
-            "tool_count": len(self.tool_ids),
-            "tools": list(self.tool_ids.keys()),
-            "assistant_id": self.assistant_id,
-            "is_ready": self.assistant_id is not None
-        }
+        if self._info_cache is None:
+            self._info_cache = {
+                "skill_key": self.skill_key,
+                "name": self.name,
+                "description": self.description,
+                "tool_count": len(self.tool_ids),
+                "tools": list(self.tool_ids.keys()),
+                "assistant_id": self.assistant_id,
+                "is_ready": self.assistant_id is not None
+            }
+        return self._info_cache
@@ -4,62 +4,64 @@ Site Updates Skill - FastAPI Endpoints
 Webhook endpoints for site progress updates using VAPI format.
 """
 
-from fastapi import APIRouter, HTTPException, Header
-from typing import Dict, Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Header
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import hashlib
 import logging
-import json
-import httpx
-import uuid
 
-from app.vapi_utils import extract_vapi_args
-from app.config import settings
-from app.skills.site_updates.processors import get_processor
+import orjson
+
+from app.vapi_utils import extract_vapi_args, vapi_reply
+from app.core.cache import TTLCache
+from app.core.http import SUPABASE_WRITE_HEADERS, get_openai_client, get_supabase_client
+from app.core.site_matching import (
+    SITE_MATCH_RESPONSE_FORMAT,
+    fuzzy_match_site,
+    parse_site_match,
+    site_match_system_prompt
+)
+from app.core.supabase import (
+    get_session_context_by_call_id,
+    get_tenant_site,
+    get_tenant_sites,
+    index_tenant_sites,
+    invalidate_tenant_sites
+)
+from app.skills.site_updates.processors import PROCESSED_FIELDS, get_processor
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["site-updates"])
 
-
-# Helper function to get session context
-async def get_session_context_by_call_id(vapi_call_id: str) -> Optional[Dict]:
-    """
-    Get session context from vapi_logs using call ID
-    """
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/vapi_logs",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params={
-                    "vapi_call_id": f"eq.{vapi_call_id}",
-                    "interaction_type": "eq.authentication",
-                    "select": "tenant_id,user_id,caller_phone,raw_log_data",
-                    "limit": "1",
-                    "order": "created_at.desc"
-                }
-            )
-
-            if response.status_code == 200:
-                logs = response.json()
-                if logs:
-                    log_entry = logs[0]
-                    return {
-                        "tenant_id": log_entry["tenant_id"],
-                        "user_id": log_entry["user_id"],
-                        "caller_phone": log_entry["caller_phone"],
-                        "user_name": log_entry["raw_log_data"].get("user_name"),
-                        "tenant_name": log_entry["raw_log_data"].get("tenant_name")
-                    }
-
-            logger.warning(f"No session context found for call ID: {vapi_call_id}")
-            return None
-
-    except Exception as e:
-        logger.error(f"Error getting session context for call {vapi_call_id}: {str(e)}")
-        return None
+# Tenant API key -> tenant_id, so dashboard polling skips the auth RPC.
+# A revoked key keeps working for at most this long.
+API_KEY_CACHE_TTL_SECONDS = 300
+_api_key_tenants = TTLCache(maxsize=10000, ttl=API_KEY_CACHE_TTL_SECONDS)
+
+# Columns of v_site_progress_updates_formatted returned by get-updates
+GET_UPDATES_SELECT = ",".join([
+    "id", "update_date", "created_at",
+    "main_focus", "materials_delivered", "work_progress", "issues", "delays",
+    "staffing", "site_visitors", "site_conditions", "follow_up_actions",
+    "summary_brief", "summary_detailed", "action_items", "blockers", "concerns",
+    "has_urgent_issues", "has_safety_concerns", "has_delays", "is_wet_weather_closure",
+    "user_name", "site", "processing_status"
+])
+
+# A row still 'processing' this long after it was last touched lost its background
+# finalize (e.g. the process died first) and is claimed and finalized again
+STALE_PROCESSING_MINUTES = 10
+STALE_PROCESSING_BATCH_SIZE = 100
+# How often each worker sweeps for stale rows
+STALE_SWEEP_INTERVAL_SECONDS = 300
+
+# Speaker labels for transcript lines; other roles (system, tool) are skipped
+TRANSCRIPT_ROLE_PREFIXES = {
+    "user": "User: ",
+    "assistant": "Assistant: "
+}
 
 
 @router.post("/api/v1/skills/site-updates/identify-site")
@@ -84,203 +86,289 @@ async def identify_site_for_update(request: dict):
 
         site_description = args.get("site_description", "")
 
-        logger.info(f"Identifying site for update. Call: {vapi_call_id}, Input: {site_description}")
+        logger.info("Identifying site for update. Call: %s, Input: %s", vapi_call_id, site_description)
 
         # Get session context
         session_context = await get_session_context_by_call_id(vapi_call_id)
 
         if not session_context:
-            return {
-                "results": [{
-                    "toolCallId": tool_call_id,
-                    "result": {
-                        "site_identified": False,
-                        "error": "Session not found. Please authenticate first.",
-                        "message": "I couldn't find your session. Please try calling again."
-                    }
-                }]
-            }
+            return vapi_reply(
+                tool_call_id,
+                site_identified=False,
+                error="Session not found. Please authenticate first.",
+                message="I couldn't find your session. Please try calling again."
+            )
 
         tenant_id = session_context["tenant_id"]
 
-        async with httpx.AsyncClient() as client:
-            # Get available sites for this tenant
-            sites_response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/entities",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params={
-                    "tenant_id": f"eq.{tenant_id}",
-                    "entity_type": "eq.sites",
-                    "is_active": "eq.true",
-                    "select": "id,name,identifier,address"
-                }
-            )
+        # Get available sites for this tenant (cached per tenant)
+        sites = await get_tenant_sites(tenant_id)
 
-            if sites_response.status_code != 200 or not sites_response.json():
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "site_identified": False,
-                            "message": "I couldn't find any active sites for your account. Please contact support."
-                        }
-                    }]
-                }
+        if not sites:
+            return vapi_reply(
+                tool_call_id,
+                site_identified=False,
+                message="I couldn't find any active sites for your account. Please contact support."
+            )
 
-            sites = sites_response.json()
-
-            # If no site_description provided, return the list of available sites
-            if not site_description or site_description.strip() == "":
-                site_list_for_assistant = [
-                    {
-                        "site_id": site['id'],
-                        "site_name": site['name'],
-                        "site_identifier": site.get('identifier'),
-                        "site_address": site.get('address')
-                    }
-                    for site in sites
-                ]
-
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "site_identified": False,
-                            "sites_list": site_list_for_assistant,
-                            "message": f"You have {len(sites)} sites available for updates."
-                        }
-                    }]
+        # If no site_description provided, return the list of available sites
+        if not site_description or site_description.strip() == "":
+            site_list_for_assistant = [
+                {
+                    "site_id": site['id'],
+                    "site_name": site['name'],
+                    "site_identifier": site.get('identifier'),
+                    "site_address": site.get('address')
                 }
-
-            # Use OpenAI to match user input to available sites
-            site_list = "\n".join([
-                f"- ID: {site['id']}, Name: {site['name']}, Identifier: {site.get('identifier', 'None')}, Address: {site.get('address', 'None')}"
                 for site in sites
-            ])
-
-            prompt = f"""
-Available construction sites:
-{site_list}
-
-User said: "{site_description}"
+            ]
 
-Which site are they referring to? You MUST use the exact ID from the list above. Return JSON only:
-{{
-  "site_found": true/false,
-  "site_id": "exact UUID from the ID field above if found, null if not found",
-  "site_name": "exact name if found",
-  "confidence": "high/medium/low"
-}}
+            return vapi_reply(
+                tool_call_id,
+                site_identified=False,
+                sites_list=site_list_for_assistant,
+                message=f"You have {len(sites)} sites available for updates."
+            )
 
-IMPORTANT: The site_id MUST be the exact UUID from the ID field, not a shortened version.
-"""
+        # Cheap local fuzzy match first; only ambiguous descriptions go to the LLM
+        matching_site = fuzzy_match_site(site_description, sites)
 
-            # Call OpenAI API for site matching
-            openai_response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
+        if not matching_site:
+            # Use OpenAI to match user input to available sites
+            openai_response = await get_openai_client().post(
+                "/chat/completions",
+                headers={"Content-Type": "application/json"},
+                content=orjson.dumps({
                     "model": "gpt-4o-mini",
-                    "max_tokens": 500,
-                    "messages": [{"role": "user", "content": prompt}]
-                }
+                    "max_tokens": 100,
+                    "temperature": 0,
+                    "top_p": 1,
+                    "response_format": SITE_MATCH_RESPONSE_FORMAT,
+                    "messages": [
+                        {"role": "system", "content": site_match_system_prompt(tenant_id, sites)},
+                        {"role": "user", "content": site_description}
+                    ]
+                })
             )
 
             if openai_response.status_code != 200:
                 logger.error(f"OpenAI API error: {openai_response.status_code} - {openai_response.text}")
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "site_identified": False,
-                            "message": "I'm having trouble matching that to a site. Could you be more specific?"
-                        }
-                    }]
-                }
+                return vapi_reply(
+                    tool_call_id,
+                    site_identified=False,
+                    message="I'm having trouble matching that to a site. Could you be more specific?"
+                )
 
             # Parse OpenAI response
-            openai_result = openai_response.json()
-            site_match_text = openai_result["choices"][0]["message"]["content"]
-
-            # Parse JSON from OpenAI response
-            try:
-                site_match = json.loads(site_match_text)
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON parsing error: {e}. Response was: {site_match_text}")
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "site_identified": False,
-                            "message": "I'm having trouble understanding which site you mean. Can you tell me the site name?"
-                        }
-                    }]
-                }
+            site_match = parse_site_match(orjson.loads(openai_response.content))
+
+            if site_match is None:
+                return vapi_reply(
+                    tool_call_id,
+                    site_identified=False,
+                    message="I'm having trouble understanding which site you mean. Can you tell me the site name?"
+                )
 
             # Validate that the returned site_id actually exists
             if site_match.get("site_found"):
                 matched_site_id = site_match["site_id"]
-                matching_site = next((site for site in sites if site["id"] == matched_site_id), None)
-
-                if matching_site:
-                    logger.info(f"Successfully identified site: {matching_site['name']}")
-                    return {
-                        "results": [{
-                            "toolCallId": tool_call_id,
-                            "result": {
-                                "site_identified": True,
-                                "site_id": matching_site["id"],
-                                "site_name": matching_site["name"],
-                                "site_identifier": matching_site.get("identifier"),
-                                "site_address": matching_site.get("address"),
-                                "message": f"Great! Let's record an update for {matching_site['name']}."
-                            }
-                        }]
-                    }
-
-            # Site not found - ask for clarification
-            site_names = [site['name'] for site in sites]
-            if len(site_names) == 1:
-                suggestion = f"Did you mean {site_names[0]}?"
-            elif len(site_names) == 2:
-                suggestion = f"Did you mean {site_names[0]} or {site_names[1]}?"
-            else:
-                suggestion = f"Your available sites are: {', '.join(site_names)}."
+                matching_site = index_tenant_sites(tenant_id, sites).get(matched_site_id)
+
+        if matching_site:
+            logger.info("Successfully identified site: %s", matching_site['name'])
+            return vapi_reply(
+                tool_call_id,
+                site_identified=True,
+                site_id=matching_site["id"],
+                site_name=matching_site["name"],
+                site_identifier=matching_site.get("identifier"),
+                site_address=matching_site.get("address"),
+                message=f"Great! Let's record an update for {matching_site['name']}."
+            )
 
-            return {
-                "results": [{
-                    "toolCallId": tool_call_id,
-                    "result": {
-                        "site_identified": False,
-                        "message": f"I couldn't match that to a site. {suggestion}"
-                    }
-                }]
-            }
+        # Site not found - ask for clarification
+        site_names = [site['name'] for site in sites]
+        if len(site_names) == 1:
+            suggestion = f"Did you mean {site_names[0]}?"
+        elif len(site_names) == 2:
+            suggestion = f"Did you mean {site_names[0]} or {site_names[1]}?"
+        else:
+            suggestion = f"Your available sites are: {', '.join(site_names)}."
+
+        return vapi_reply(
+            tool_call_id,
+            site_identified=False,
+            message=f"I couldn't match that to a site. {suggestion}"
+        )
 
     except Exception as e:
         logger.error(f"Site identification error: {str(e)}")
-        return {
-            "results": [{
-                "toolCallId": tool_call_id if 'tool_call_id' in locals() else "unknown",
-                "result": {
-                    "site_identified": False,
-                    "error": f"System error: {str(e)}",
-                    "message": "I'm having trouble processing that. Please try again."
-                }
-            }]
-        }
+        return vapi_reply(
+            tool_call_id if 'tool_call_id' in locals() else "unknown",
+            site_identified=False,
+            error=f"System error: {str(e)}",
+            message="I'm having trouble processing that. Please try again."
+        )
+
+
+def _build_transcript(messages: List[Dict]) -> str:
+    """Render VAPI call messages as "User: ..." / "Assistant: ..." lines in one pass"""
+    lines = (
+        (TRANSCRIPT_ROLE_PREFIXES.get(msg.get("role", "")), msg.get("content", "") or msg.get("message", ""))
+        for msg in messages
+    )
+    return "".join(f"{prefix}{content}\n" for prefix, content in lines if prefix and content)
+
+
+def _pending_update_data(raw_transcript: str) -> Dict:
+    """Update data for the AI processor; everything but the transcript is extracted by it"""
+    return {
+        "main_focus": None,  # Will be extracted by AI processor
+        "is_wet_weather_closure": False,  # Will be determined by AI processor
+        "materials_delivered": None,
+        "work_progress": None,
+        "issues": None,
+        "delays": None,
+        "staffing": None,
+        "site_visitors": None,
+        "site_conditions": None,
+        "follow_up_actions": None,
+        "raw_transcript": raw_transcript  # Use real conversation transcript
+    }
+
+
+async def _finalize_update(update_id: str, update_data: Dict):
+    """
+    Run AI processing for a stored update and write the extracted fields back.
+
+    Runs as a background task after save-update has responded, so the caller
+    isn't kept waiting on the LLM.
+
+    Args:
+        update_id: site_progress_updates row to complete
+        update_data: Update data including the raw transcript
+    """
+    processing_status = "failed"
+    fields: Dict = {}
+    try:
+        # AI processor returns the full structured data including main_focus, work_progress, etc.
+        # The transcript was stored with the row, so only the extracted columns are sent back.
+        processed = await get_processor().process_update(update_data)
+        fields = {key: value for key, value in processed.items() if key in PROCESSED_FIELDS}
+        processing_status = "completed"
+    except Exception as e:
+        logger.error(f"AI processing failed for site update {update_id}: {str(e)}")
+
+    try:
+        response = await get_supabase_client().patch(
+            "/site_progress_updates",
+            params={"id": f"eq.{update_id}"},
+            headers=SUPABASE_WRITE_HEADERS,
+            content=orjson.dumps({**fields, "processing_status": processing_status})
+        )
+
+        if response.status_code not in (200, 204):
+            logger.error(f"Failed to finalize site update {update_id}: {response.status_code} - {response.text}")
+
+    except Exception as e:
+        logger.error(f"Error finalizing site update {update_id}: {str(e)}")
+
+
+async def _claim_stale_update(update_id: str, cutoff: datetime) -> Optional[Dict]:
+    """
+    Claim a stale update for this worker.
+
+    The PATCH only matches while the row is still 'processing' and untouched
+    since the cutoff, and it bumps updated_at, so when several workers sweep
+    at once exactly one of them gets the row back.
+
+    Returns:
+        The claimed row with its raw transcript, or None if it was already
+        finalized or claimed elsewhere
+    """
+    response = await get_supabase_client().patch(
+        "/site_progress_updates",
+        params={
+            "id": f"eq.{update_id}",
+            "processing_status": "eq.processing",
+            "updated_at": f"lt.{cutoff.isoformat()}",
+            "select": "id,raw_transcript"
+        },
+        headers={
+            "Content-Type": "application/json",
+            "Prefer": "return=representation"
+        },
+        content=orjson.dumps({"updated_at": datetime.now(timezone.utc).isoformat()})
+    )
+
+    if response.status_code != 200:
+        logger.error(f"Failed to claim stale site update {update_id}: {response.status_code} - {response.text}")
+        return None
+
+    rows = orjson.loads(response.content)
+    return rows[0] if rows else None
+
+
+async def resume_stale_updates() -> int:
+    """
+    Finalize updates left in 'processing' by a background task that never ran.
+
+    Rows are only picked up once untouched for STALE_PROCESSING_MINUTES, so
+    updates still being processed by a live worker are left alone. Each row
+    is claimed before it is processed, so it is finalized by one worker only.
+
+    Returns:
+        Number of updates finalized again
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=STALE_PROCESSING_MINUTES)
+    try:
+        response = await get_supabase_client().get(
+            "/site_progress_updates",
+            params={
+                "processing_status": "eq.processing",
+                "updated_at": f"lt.{cutoff.isoformat()}",
+                "select": "id",
+                "order": "created_at.asc",
+                "limit": str(STALE_PROCESSING_BATCH_SIZE)
+            }
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Failed to look up stale site updates: {response.status_code} - {response.text}")
+            return 0
+
+        stale_updates = orjson.loads(response.content)
+    except Exception as e:
+        logger.error(f"Error looking up stale site updates: {str(e)}")
+        return 0
+
+    resumed = 0
+    for row in stale_updates:
+        try:
+            claimed = await _claim_stale_update(row["id"], cutoff)
+        except Exception as e:
+            logger.error(f"Error claiming stale site update {row['id']}: {str(e)}")
+            continue
+
+        if claimed:
+            logger.warning("Resuming AI processing for stale site update %s", row["id"])
+            await _finalize_update(row["id"], _pending_update_data(claimed.get("raw_transcript") or ""))
+            resumed += 1
+
+    return resumed
+
+
+async def sweep_stale_updates():
+    """Run resume_stale_updates() every STALE_SWEEP_INTERVAL_SECONDS until cancelled"""
+    while True:
+        await resume_stale_updates()
+        await asyncio.sleep(STALE_SWEEP_INTERVAL_SECONDS)
 
 
 @router.post("/api/v1/skills/site-updates/save-update")
-async def save_site_progress_update(request: dict):
+async def save_site_progress_update(request: dict, background_tasks: BackgroundTasks):
     """
-    Save a complete site progress update with AI processing
+    Save a site progress update; AI processing runs after the response
     """
     tool_call_id, args = extract_vapi_args(request)
 
@@ -298,34 +386,26 @@ async def save_site_progress_update(request: dict):
         site_id = args.get("site_id")
 
         if not site_id:
-            return {
-                "results": [{
-                    "toolCallId": tool_call_id,
-                    "result": {
-                        "success": False,
-                        "error": "Site ID is required",
-                        "message": "I need to know which site this update is for."
-                    }
-                }]
-            }
+            return vapi_reply(
+                tool_call_id,
+                success=False,
+                error="Site ID is required",
+                message="I need to know which site this update is for."
+            )
 
-        logger.info(f"Saving site progress update for site: {site_id}, call: {vapi_call_id}")
-        logger.info(f"Received {len(messages)} messages in request")
+        logger.info("Saving site progress update for site: %s, call: %s", site_id, vapi_call_id)
+        logger.info("Received %s messages in request", len(messages))
 
         # Get session context
         session_context = await get_session_context_by_call_id(vapi_call_id)
 
         if not session_context:
-            return {
-                "results": [{
-                    "toolCallId": tool_call_id,
-                    "result": {
-                        "success": False,
-                        "error": "Session not found",
-                        "message": "I couldn't find your session. Please try calling again."
-                    }
-                }]
-            }
+            return vapi_reply(
+                tool_call_id,
+                success=False,
+                error="Session not found",
+                message="I couldn't find your session. Please try calling again."
+            )
 
         tenant_id = session_context["tenant_id"]
         user_id = session_context["user_id"]
@@ -334,147 +414,131 @@ async def save_site_progress_update(request: dict):
         # VAPI sends the conversation messages directly in the tool call request
         real_transcript = ""
         if messages:
-            for msg in messages:
-                role = msg.get("role", "")
-                content = msg.get("content", "") or msg.get("message", "")
-                if content:
-                    if role == "user":
-                        real_transcript += f"User: {content}\n"
-                    elif role == "assistant":
-                        real_transcript += f"Assistant: {content}\n"
-            logger.info(f"Built transcript from {len(messages)} messages (length: {len(real_transcript)})")
+            real_transcript = _build_transcript(messages)
+            logger.info("Built transcript from %s messages (length: %s)", len(messages), len(real_transcript))
 
         # Fallback to raw_notes from assistant if no messages available
         if not real_transcript:
             real_transcript = args.get("raw_notes", "")
-            logger.info(f"No messages in request, using raw_notes from assistant (length: {len(real_transcript)})")
-
-        # Build update data with real transcript
-        update_data = {
-            "main_focus": None,  # Will be extracted by AI processor
-            "is_wet_weather_closure": False,  # Will be determined by AI processor
-            "materials_delivered": None,
-            "work_progress": None,
-            "issues": None,
-            "delays": None,
-            "staffing": None,
-            "site_visitors": None,
-            "site_conditions": None,
-            "follow_up_actions": None,
-            "raw_transcript": real_transcript  # Use real conversation transcript
-        }
+            logger.info("No messages in request, using raw_notes from assistant (length: %s)", len(real_transcript))
+
+        # Verify site exists and belongs to tenant against the cached site list
+        # (already warm from authentication / identify-site, so usually no round trip)
+        site_info = await get_tenant_site(tenant_id, site_id)
+
+        if not site_info:
+            return vapi_reply(
+                tool_call_id,
+                success=False,
+                error="Site not found or access denied",
+                message="I couldn't verify that site. Please try again."
+            )
 
-        # Process with OpenAI to extract intelligence
-        processor = get_processor()
-        ai_processed = await processor.process_update(update_data)
-
-        # Generate unique ID for this update
-        update_id = str(uuid.uuid4())
-
-        # Merge AI-extracted structured fields with the original data
-        # AI processor now returns the full structured data including main_focus, work_progress, etc.
-        complete_update = {
-            "id": update_id,
-            "site_id": site_id,
-            "user_id": user_id,
-            "tenant_id": tenant_id,
-            "vapi_call_id": vapi_call_id,
-            "raw_transcript": real_transcript,  # Store the real tagged transcript
-            **ai_processed,  # AI-extracted data includes all structured fields now
-            "processing_status": "completed"
-        }
+        site_name = site_info["name"]
 
-        # Store in database
-        async with httpx.AsyncClient() as client:
-            # Verify site exists and belongs to tenant
-            site_check = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/entities",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params={
-                    "id": f"eq.{site_id}",
-                    "tenant_id": f"eq.{tenant_id}",
-                    "entity_type": "eq.sites",
-                    "select": "id,name"
-                }
-            )
+        # Store the transcript straight away; AI-extracted fields are filled in
+        # after the response by _finalize_update. The id is generated by Postgres.
+        client = get_supabase_client()
+        store_response = await client.post(
+            "/site_progress_updates",
+            params={"select": "id"},
+            headers={
+                "Content-Type": "application/json",
+                "Prefer": "return=representation"
+            },
+            content=orjson.dumps({
+                "site_id": site_id,
+                "user_id": user_id,
+                "tenant_id": tenant_id,
+                "vapi_call_id": vapi_call_id,
+                "raw_transcript": real_transcript,  # Store the real tagged transcript
+                "processing_status": "processing"
+            })
+        )
 
-            if site_check.status_code != 200 or not site_check.json():
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "success": False,
-                            "error": "Site not found or access denied",
-                            "message": "I couldn't verify that site. Please try again."
-                        }
-                    }]
-                }
+        if store_response.status_code == 201:
+            update_id = orjson.loads(store_response.content)[0]["id"]
+            logger.info("Site progress update saved for %s: %s", site_name, update_id)
 
-            site_info = site_check.json()[0]
-            site_name = site_info["name"]
-
-            # Save the update
-            store_response = await client.post(
-                f"{settings.SUPABASE_URL}/rest/v1/site_progress_updates",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                json=complete_update
-            )
+            # If this task never runs, the stale update sweep picks the row up later
+            logger.info("Queued AI processing for site update %s (call %s)", update_id, vapi_call_id)
+            background_tasks.add_task(_finalize_update, update_id, _pending_update_data(real_transcript))
 
-            if store_response.status_code == 201:
-                logger.info(f"Site progress update saved for {site_name}: {update_id}")
-
-                # Build response message
-                message = f"Perfect! I've saved your update for {site_name}."
-
-                if ai_processed.get("has_urgent_issues"):
-                    message += " I've flagged the urgent issues for immediate attention."
-
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "success": True,
-                            "update_id": update_id,
-                            "site_name": site_name,
-                            "message": message,
-                            "has_urgent_issues": ai_processed.get("has_urgent_issues", False),
-                            "has_safety_concerns": ai_processed.get("has_safety_concerns", False)
-                        }
-                    }]
-                }
-            else:
-                logger.error(f"Failed to store site update: {store_response.status_code} - {store_response.text}")
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "success": False,
-                            "error": f"Database error: {store_response.status_code}",
-                            "message": "I'm having trouble saving your update. Please try again."
-                        }
-                    }]
-                }
+            return vapi_reply(
+                tool_call_id,
+                success=True,
+                update_id=update_id,
+                site_name=site_name,
+                message=f"Perfect! I've saved your update for {site_name}."
+            )
+        else:
+            logger.error(f"Failed to store site update: {store_response.status_code} - {store_response.text}")
+            return vapi_reply(
+                tool_call_id,
+                success=False,
+                error=f"Database error: {store_response.status_code}",
+                message="I'm having trouble saving your update. Please try again."
+            )
 
     except Exception as e:
         logger.error(f"Site update save error: {str(e)}")
-        return {
-            "results": [{
-                "toolCallId": tool_call_id,
-                "result": {
-                    "success": False,
-                    "error": f"System error: {str(e)}",
-                    "message": "I'm having trouble saving your update. Please try again."
-                }
-            }]
-        }
+        return vapi_reply(
+            tool_call_id,
+            success=False,
+            error=f"System error: {str(e)}",
+            message="I'm having trouble saving your update. Please try again."
+        )
+
+
+async def _authenticate_tenant(authorization: Optional[str]) -> str:
+    """
+    Resolve a tenant API key ("Bearer <key>") to its tenant_id.
+
+    Raises:
+        HTTPException: 401 if the header is missing or the key is invalid
+    """
+    # Authenticate using the authorization header (same as voice notes endpoint)
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
+
+    api_key = authorization.replace("Bearer ", "")
+
+    # Keyed by a digest so raw API keys aren't held in memory
+    cache_key = hashlib.blake2b(api_key.encode(), digest_size=16).digest()
+    tenant_id = _api_key_tenants.get(cache_key)
+    if tenant_id:
+        return tenant_id
+
+    # Authenticate with Supabase
+    auth_response = await get_supabase_client().post(
+        "/rpc/authenticate_tenant_by_api_key",
+        json={"api_key_input": api_key}
+    )
+
+    if auth_response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+    # The RPC returns the tenant_id directly as a string, not wrapped in an object
+    tenant_id = orjson.loads(auth_response.content)
+    if not tenant_id:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+
+    _api_key_tenants.set(cache_key, tenant_id)
+    return tenant_id
+
+
+@router.post("/api/v1/skills/site-updates/invalidate-sites")
+async def invalidate_sites_cache(authorization: str = Header(None)):
+    """
+    Drop the calling tenant's cached site list
+
+    Call this after adding, renaming or deactivating sites so voice calls
+    see the change immediately instead of after the cache TTL.
+    """
+    tenant_id = await _authenticate_tenant(authorization)
+    invalidate_tenant_sites(tenant_id)
+
+    return {"success": True, "tenant_id": tenant_id}
 
 
 @router.get("/api/v1/skills/site-updates/get-updates")
@@ -491,116 +555,41 @@ async def get_site_progress_updates(
     - AI-extracted action items, blockers, concerns
     - Safety flags and urgent issue indicators
     """
-    from fastapi import HTTPException
-    import os
-
-    # Authenticate using the authorization header (same as voice notes endpoint)
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
+    tenant_id = await _authenticate_tenant(authorization)
+    client = get_supabase_client()
 
-    api_key = authorization.replace("Bearer ", "")
-
-    # Authenticate with Supabase
-    supabase_url = os.getenv('SUPABASE_URL')
-    supabase_service_key = os.getenv('SUPABASE_SERVICE_KEY')
+    try:
+        # Build query parameters
+        params = {
+            "tenant_id": f"eq.{tenant_id}",
+            "select": GET_UPDATES_SELECT,
+            "order": "update_date.desc,created_at.desc",
+            "limit": str(limit)
+        }
 
-    if not supabase_url or not supabase_service_key:
-        raise HTTPException(status_code=500, detail="Server configuration error")
+        # Add site filter if specified
+        if site_id:
+            params["site_id"] = f"eq.{site_id}"
 
-    async with httpx.AsyncClient() as auth_client:
-        auth_response = await auth_client.post(
-            f"{supabase_url}/rest/v1/rpc/authenticate_tenant_by_api_key",
-            headers={
-                "apikey": supabase_service_key,
-                "Authorization": f"Bearer {supabase_service_key}",
-                "Content-Type": "application/json"
-            },
-            json={"api_key_input": api_key}
+        # Rows come back already in API shape (see migrations/003_*_formatted_view.sql)
+        response = await client.get(
+            "/v_site_progress_updates_formatted",
+            params=params
         )
 
-        if auth_response.status_code != 200:
-            raise HTTPException(status_code=401, detail="Invalid API key")
+        if response.status_code == 200:
+            updates = orjson.loads(response.content)
 
-        # The RPC returns the tenant_id directly as a string, not wrapped in an object
-        tenant_id = auth_response.json()
-        if not tenant_id:
-            raise HTTPException(status_code=401, detail="Authentication failed")
-
-    try:
-        async with httpx.AsyncClient() as client:
-            # Build query parameters
-            params = {
-                "tenant_id": f"eq.{tenant_id}",
-                "select": "id,site_id,update_date,main_focus,materials_delivered,work_progress,issues,delays,staffing,site_visitors,site_conditions,follow_up_actions,summary_brief,summary_detailed,extracted_action_items,identified_blockers,flagged_concerns,has_urgent_issues,has_safety_concerns,has_delays,is_wet_weather_closure,created_at,users(name),entities(name,identifier,address)",
-                "order": "update_date.desc,created_at.desc",
-                "limit": str(limit)
-            }
-
-            # Add site filter if specified
-            if site_id:
-                params["site_id"] = f"eq.{site_id}"
-
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/site_progress_updates",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params=params
-            )
-
-            if response.status_code == 200:
-                updates = response.json()
-
-                # Format the response
-                formatted_updates = []
-                for update in updates:
-                    formatted_update = {
-                        "id": update["id"],
-                        "update_date": update["update_date"],
-                        "created_at": update["created_at"],
-                        "main_focus": update.get("main_focus"),
-                        "materials_delivered": update.get("materials_delivered"),
-                        "work_progress": update.get("work_progress"),
-                        "issues": update.get("issues"),
-                        "delays": update.get("delays"),
-                        "staffing": update.get("staffing"),
-                        "site_visitors": update.get("site_visitors"),
-                        "site_conditions": update.get("site_conditions"),
-                        "follow_up_actions": update.get("follow_up_actions"),
-                        "summary_brief": update.get("summary_brief"),
-                        "summary_detailed": update.get("summary_detailed"),
-                        "action_items": update.get("extracted_action_items", []),
-                        "blockers": update.get("identified_blockers", []),
-                        "concerns": update.get("flagged_concerns", []),
-                        "has_urgent_issues": update.get("has_urgent_issues", False),
-                        "has_safety_concerns": update.get("has_safety_concerns", False),
-                        "has_delays": update.get("has_delays", False),
-                        "is_wet_weather_closure": update.get("is_wet_weather_closure", False),
-                        "user_name": update.get("users", {}).get("name") if update.get("users") else None
-                    }
-
-                    # Add site info
-                    if update.get("entities"):
-                        site_info = update["entities"]
-                        formatted_update["site"] = {
-                            "name": site_info.get("name"),
-                            "identifier": site_info.get("identifier"),
-                            "address": site_info.get("address")
-                        }
-
-                    formatted_updates.append(formatted_update)
-
-                return {
-                    "success": True,
-                    "updates": formatted_updates,
-                    "total": len(formatted_updates),
-                    "filters": {
-                        "site_id": site_id
-                    }
+            return {
+                "success": True,
+                "updates": updates,
+                "total": len(updates),
+                "filters": {
+                    "site_id": site_id
                 }
-            else:
-                return {"success": False, "error": f"Database error: {response.text}"}
+            }
+        else:
+            return {"success": False, "error": f"Database error: {response.text}"}
 
     except Exception as e:
         logger.error(f"Error retrieving site updates: {str(e)}")
@@ -8,15 +8,204 @@ Extracts structured intelligence from raw site progress updates including:
 - Summaries
 """
 
-import json
+import asyncio
+import hashlib
 import logging
+import random
+import re
+from functools import lru_cache
 from typing import Dict, List, Optional
-import httpx
+
+import orjson
 
 from app.config import settings
+from app.core.cache import TTLCache
+from app.core.http import get_openai_client
 
 logger = logging.getLogger(__name__)
 
+RESULT_CACHE_SIZE = 1000
+RESULT_CACHE_TTL_SECONDS = 3600
+
+# Bursts of updates queue here rather than exhausting the OpenAI connection
+# pool or tripping rate limits; rate limits and server errors are retried
+OPENAI_MAX_ATTEMPTS = 3
+OPENAI_RETRY_BASE_SECONDS = 0.5
+OPENAI_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_openai_slots: Optional[asyncio.Semaphore] = None
+_openai_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Keywords behind the fallback's issue flags, one named group per flag. Matched
+# as substrings (e.g. "delay" also catches "delayed"), in a single pass.
+_FALLBACK_FLAGS_RE = re.compile(
+    r"(?P<has_urgent_issues>urgent|critical|emergency|immediate)"
+    r"|(?P<has_safety_concerns>safety|hazard|injury|dangerous|unsafe)"
+    r"|(?P<has_delays>delay|behind|postpone|reschedule)"
+    r"|(?P<has_material_issues>material|delivery|supply|shortage)",
+    re.IGNORECASE
+)
+
+# Completion token limits; typical extractions are 300-600 tokens
+BASE_OUTPUT_TOKENS = 400
+MAX_OUTPUT_TOKENS = 1200
+
+# Columns of site_progress_updates filled in from processing results. Anything
+# else the model returns (e.g. an echoed raw_transcript) is dropped.
+PROCESSED_FIELDS = frozenset({
+    "main_focus",
+    "is_wet_weather_closure",
+    "materials_delivered",
+    "work_progress",
+    "issues",
+    "delays",
+    "staffing",
+    "site_visitors",
+    "site_conditions",
+    "follow_up_actions",
+    "summary_brief",
+    "summary_detailed",
+    "has_urgent_issues",
+    "has_safety_concerns",
+    "has_delays",
+    "has_material_issues",
+    "extracted_action_items",
+    "identified_blockers",
+    "flagged_concerns"
+})
+
+
+def _text(description: str) -> Dict:
+    """Schema for a nullable text field"""
+    return {"type": ["string", "null"], "description": description}
+
+
+def _item_list(properties: Dict) -> Dict:
+    """Schema for an array of objects with all of the given properties"""
+    return {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": properties,
+            "required": list(properties),
+            "additionalProperties": False
+        }
+    }
+
+
+_PROCESSING_SCHEMA_PROPERTIES = {
+    "main_focus": _text("Brief description of main work focus today"),
+    "is_wet_weather_closure": {"type": "boolean"},
+    "materials_delivered": _text("Summary of materials/deliveries mentioned, or null"),
+    "work_progress": _text("Summary of work completed and progress made"),
+    "issues": _text("Summary of issues and problems mentioned, or null"),
+    "delays": _text("Summary of delays and schedule impacts, or null"),
+    "staffing": _text("Summary of staffing situation and crew updates, or null"),
+    "site_visitors": _text("Summary of visitors and their purpose, or null"),
+    "site_conditions": _text("Summary of site conditions and safety observations, or null"),
+    "follow_up_actions": _text("Summary of planned actions and follow-ups, or null"),
+    "summary_brief": {"type": "string", "description": "2-3 sentence overview of the day"},
+    "summary_detailed": {"type": "string", "description": "Comprehensive paragraph covering all major points"},
+    "has_urgent_issues": {"type": "boolean"},
+    "has_safety_concerns": {"type": "boolean"},
+    "has_delays": {"type": "boolean"},
+    "has_material_issues": {"type": "boolean"},
+    "extracted_action_items": _item_list({
+        "action": {"type": "string", "description": "Specific action needed"},
+        "priority": {"type": "string", "enum": ["high", "medium", "low"]},
+        "deadline": _text("Estimated completion date or null"),
+        "assigned_to": _text("Role or person if mentioned, otherwise null")
+    }),
+    "identified_blockers": _item_list({
+        "blocker_type": {"type": "string", "enum": ["material", "weather", "staffing", "equipment", "other"]},
+        "description": {"type": "string", "description": "What is blocking progress"},
+        "impact": {"type": "string", "description": "How this affects the project"},
+        "estimated_resolution": _text("When this might be resolved or null")
+    }),
+    "flagged_concerns": _item_list({
+        "concern_type": {"type": "string", "enum": ["safety", "quality", "schedule", "budget", "other"]},
+        "severity": {"type": "string", "enum": ["critical", "high", "medium", "low"]},
+        "description": {"type": "string", "description": "Details of the concern"}
+    })
+}
+
+# Structured outputs guarantee a parseable object with exactly these fields,
+# so the schema no longer needs spelling out in the prompt
+SITE_UPDATE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "site_update",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": _PROCESSING_SCHEMA_PROPERTIES,
+            "required": list(_PROCESSING_SCHEMA_PROPERTIES),
+            "additionalProperties": False
+        }
+    }
+}
+
+# Static instructions, sent first and byte-for-byte identical on every call so
+# OpenAI can serve this prefix from its prompt cache; only the update data in
+# the user message varies.
+SITE_UPDATE_SYSTEM_PROMPT = """You are an expert construction project analyst. Extract structured information from site progress updates.
+
+IMPORTANT:
+- Use empty arrays [] if no items found in a category
+- Use null for text fields if information not mentioned
+- Extract ALL structured fields from the conversation
+- Be specific and actionable in extracted items
+- Identify urgent issues even if not explicitly stated (e.g., safety hazards, critical path delays)
+"""
+
+# User message templates. The fixed lead-in comes before the update data, so
+# it extends the cacheable prefix started by the system prompt.
+PROMPT_LEAD_IN = "Analyze this construction site progress update and extract structured information."
+
+TRANSCRIPT_PROMPT_TEMPLATE = PROMPT_LEAD_IN + """
+
+RAW CONVERSATION TRANSCRIPT:
+{raw_transcript}
+
+Analyze this complete site progress conversation and extract ALL structured information from it."""
+
+FIELDS_PROMPT_TEMPLATE = PROMPT_LEAD_IN + """
+
+SITE UPDATE DATA:
+{fields}"""
+
+# (label, update_data key) for the fields prompt. Empty fields are left out
+# rather than sent as "N/A" lines.
+PROMPT_FIELDS = (
+    ("Main Focus", "main_focus"),
+    ("Wet Weather Closure", "is_wet_weather_closure"),
+    ("Materials/Deliveries", "materials_delivered"),
+    ("Work Progress", "work_progress"),
+    ("Issues", "issues"),
+    ("Delays", "delays"),
+    ("Staffing", "staffing"),
+    ("Site Visitors", "site_visitors"),
+    ("Site Conditions", "site_conditions"),
+    ("Follow-up Actions", "follow_up_actions")
+)
+EMPTY_PROMPT_VALUES = (None, "", "N/A", False)
+
+
+def _get_openai_slots() -> asyncio.Semaphore:
+    """
+    Get the semaphore limiting concurrent OpenAI requests.
+
+    A semaphore belongs to the event loop it first waits on, so it is
+    recreated if called from a different loop (e.g. test clients).
+    """
+    global _openai_slots, _openai_slots_loop
+
+    loop = asyncio.get_running_loop()
+    if _openai_slots is None or _openai_slots_loop is not loop:
+        _openai_slots = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+        _openai_slots_loop = loop
+
+    return _openai_slots
+
 
 class SiteUpdateProcessor:
     """
@@ -29,68 +218,112 @@ class SiteUpdateProcessor:
     """
 
     def __init__(self):
-        self.openai_url = "https://api.openai.com/v1/chat/completions"
         self.model = "gpt-4o-mini"  # Fast and cost-effective
+        # Exact-content cache of AI results; failed calls aren't cached
+        self._results = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL_SECONDS)
 
     async def process_update(self, update_data: Dict) -> Dict:
         """
         Process a site update through OpenAI to extract intelligence
 
+        Results are cached by exact content, so retried or duplicate
+        submissions (and concurrent copies of one) make a single OpenAI call.
+
         Args:
             update_data: Raw update data from VAPI conversation
 
         Returns:
             Dict with AI-processed fields ready for database
         """
+        cache_key = hashlib.blake2b(
+            orjson.dumps(update_data, option=orjson.OPT_SORT_KEYS),
+            digest_size=16
+        ).digest()
+
+        processed = await self._results.get_or_load(cache_key, lambda: self._process_with_openai(update_data))
+        if processed is None:
+            return self._get_fallback_processing(update_data)
+
+        return processed
+
+    async def _process_with_openai(self, update_data: Dict) -> Optional[Dict]:
+        """
+        Call OpenAI for a site update
+
+        Returns:
+            The AI-processed fields, or None if the call or parsing failed
+        """
         # Build comprehensive prompt
         prompt = self._build_processing_prompt(update_data)
 
+        body = orjson.dumps({
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": SITE_UPDATE_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "response_format": SITE_UPDATE_RESPONSE_FORMAT,
+            "temperature": 0.3,  # Lower temperature for consistent extraction
+            "max_tokens": self._max_output_tokens(prompt),
+            "n": 1,
+            "stream": False
+        })
+
         # Call OpenAI
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        try:
+            client = get_openai_client()
+            for attempt in range(OPENAI_MAX_ATTEMPTS):
+                async with _get_openai_slots():
+                    response = await client.post(
+                        "/chat/completions",
+                        headers={"Content-Type": "application/json"},
+                        content=body
+                    )
+
+                if response.status_code not in OPENAI_RETRY_STATUSES or attempt == OPENAI_MAX_ATTEMPTS - 1:
+                    break
+
+                # Back off outside the semaphore so waiting retries don't hold a slot
+                delay = OPENAI_RETRY_BASE_SECONDS * 2 ** attempt + random.random() * 0.25
+                logger.warning(f"OpenAI API returned {response.status_code}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+            if response.status_code != 200:
+                logger.error(f"OpenAI API error: {response.status_code} - {response.text}")
+                return None
+
+            result = orjson.loads(response.content)
+            ai_response = result["choices"][0]["message"]["content"]
+
+            # Parse JSON response
             try:
-                response = await client.post(
-                    self.openai_url,
-                    headers={
-                        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "You are an expert construction project analyst. Extract structured information from site progress updates."
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "temperature": 0.3,  # Lower temperature for consistent extraction
-                        "max_tokens": 2000
-                    }
-                )
-
-                if response.status_code != 200:
-                    logger.error(f"OpenAI API error: {response.status_code} - {response.text}")
-                    return self._get_fallback_processing(update_data)
-
-                result = response.json()
-                ai_response = result["choices"][0]["message"]["content"]
-
-                # Parse JSON response
-                try:
-                    processed = json.loads(ai_response)
-                    logger.info(f"Successfully processed site update with AI")
-                    return processed
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse AI response as JSON: {e}")
-                    logger.error(f"AI Response: {ai_response}")
-                    return self._get_fallback_processing(update_data)
-
-            except Exception as e:
-                logger.error(f"Error processing update with OpenAI: {e}")
-                return self._get_fallback_processing(update_data)
+                processed = orjson.loads(ai_response)
+                logger.info(f"Successfully processed site update with AI")
+                return processed
+            except orjson.JSONDecodeError as e:
+                logger.error(f"Failed to parse AI response as JSON: {e}")
+                logger.error(f"AI Response: {ai_response}")
+                return None
+
+        except Exception as e:
+            logger.error(f"Error processing update with OpenAI: {e}")
+            return None
+
+    def _max_output_tokens(self, prompt: str) -> int:
+        """
+        Size the completion limit to the update being processed
+
+        Summaries grow with what was said, so the limit scales with the prompt
+        (roughly 4 characters per token, half as much output as input) instead
+        of reserving the full ceiling for every short update.
+        """
+        return min(MAX_OUTPUT_TOKENS, BASE_OUTPUT_TOKENS + len(prompt) // 8)
 
     def _build_processing_prompt(self, update_data: Dict) -> str:
         """Build the prompt for OpenAI processing"""
@@ -98,83 +331,16 @@ class SiteUpdateProcessor:
 
         # If we have a raw transcript, use that as the primary source
         if raw_transcript:
-            data_section = f"""
-RAW CONVERSATION TRANSCRIPT:
-{raw_transcript}
+            return TRANSCRIPT_PROMPT_TEMPLATE.format(raw_transcript=raw_transcript)
 
-Analyze this complete site progress conversation and extract ALL structured information from it."""
-        else:
-            # Fallback to individual fields if available
-            data_section = f"""
-SITE UPDATE DATA:
-- Main Focus: {update_data.get('main_focus', 'N/A')}
-- Wet Weather Closure: {update_data.get('is_wet_weather_closure', False)}
-- Materials/Deliveries: {update_data.get('materials_delivered', 'N/A')}
-- Work Progress: {update_data.get('work_progress', 'N/A')}
-- Issues: {update_data.get('issues', 'N/A')}
-- Delays: {update_data.get('delays', 'N/A')}
-- Staffing: {update_data.get('staffing', 'N/A')}
-- Site Visitors: {update_data.get('site_visitors', 'N/A')}
-- Site Conditions: {update_data.get('site_conditions', 'N/A')}
-- Follow-up Actions: {update_data.get('follow_up_actions', 'N/A')}"""
-
-        return f"""
-Analyze this construction site progress update and extract structured information.
-
-{data_section}
-
-Extract and return ONLY valid JSON with this exact structure (no markdown, no explanation):
-
-{{
-  "main_focus": "Brief description of main work focus today",
-  "is_wet_weather_closure": true/false,
-  "materials_delivered": "Summary of materials/deliveries mentioned, or null",
-  "work_progress": "Summary of work completed and progress made",
-  "issues": "Summary of issues and problems mentioned, or null",
-  "delays": "Summary of delays and schedule impacts, or null",
-  "staffing": "Summary of staffing situation and crew updates, or null",
-  "site_visitors": "Summary of visitors and their purpose, or null",
-  "site_conditions": "Summary of site conditions and safety observations, or null",
-  "follow_up_actions": "Summary of planned actions and follow-ups, or null",
-  "summary_brief": "2-3 sentence overview of the day",
-  "summary_detailed": "Comprehensive paragraph covering all major points",
-  "has_urgent_issues": true/false,
-  "has_safety_concerns": true/false,
-  "has_delays": true/false,
-  "has_material_issues": true/false,
-  "extracted_action_items": [
-    {{
-      "action": "Specific action needed",
-      "priority": "high/medium/low",
-      "deadline": "estimated completion date or null",
-      "assigned_to": "role or person if mentioned, otherwise null"
-    }}
-  ],
-  "identified_blockers": [
-    {{
-      "blocker_type": "material/weather/staffing/equipment/other",
-      "description": "What is blocking progress",
-      "impact": "How this affects the project",
-      "estimated_resolution": "When this might be resolved or null"
-    }}
-  ],
-  "flagged_concerns": [
-    {{
-      "concern_type": "safety/quality/schedule/budget/other",
-      "severity": "critical/high/medium/low",
-      "description": "Details of the concern"
-    }}
-  ]
-}}
-
-IMPORTANT:
-- Return ONLY the JSON object
-- Use empty arrays [] if no items found in a category
-- Use null for text fields if information not mentioned
-- Extract ALL structured fields from the conversation
-- Be specific and actionable in extracted items
-- Identify urgent issues even if not explicitly stated (e.g., safety hazards, critical path delays)
-"""
+        # Fallback to individual fields if available
+        get = update_data.get
+        fields = "\n".join(
+            f"- {label}: {value}"
+            for label, key in PROMPT_FIELDS
+            if (value := get(key)) not in EMPTY_PROMPT_VALUES
+        )
+        return FIELDS_PROMPT_TEMPLATE.format(fields=fields or "- (no structured data provided)")
 
     def _get_fallback_processing(self, update_data: Dict) -> Dict:
         """
@@ -182,33 +348,40 @@ IMPORTANT:
 
         Returns minimal processed data with simple heuristics
         """
-        # Simple keyword-based detection
-        text_content = " ".join([
-            str(v) for v in update_data.values() if v and isinstance(v, str)
-        ]).lower()
-
         return {
             "summary_brief": f"Site update recorded for {update_data.get('main_focus', 'general progress')}",
             "summary_detailed": f"Main focus: {update_data.get('main_focus', 'N/A')}. "
                               f"Work progress: {update_data.get('work_progress', 'N/A')}. "
                               f"Issues: {update_data.get('issues', 'None reported')}.",
-            "has_urgent_issues": any(word in text_content for word in ['urgent', 'critical', 'emergency', 'immediate']),
-            "has_safety_concerns": any(word in text_content for word in ['safety', 'hazard', 'injury', 'dangerous', 'unsafe']),
-            "has_delays": any(word in text_content for word in ['delay', 'behind', 'postpone', 'reschedule']),
-            "has_material_issues": any(word in text_content for word in ['material', 'delivery', 'supply', 'shortage']),
+            **self._keyword_flags(update_data),
             "extracted_action_items": [],
             "identified_blockers": [],
             "flagged_concerns": []
         }
 
+    def _keyword_flags(self, update_data: Dict) -> Dict[str, bool]:
+        """
+        Simple keyword-based detection of the issue flags
+
+        Each text field is scanned once, stopping as soon as every flag is set.
+        """
+        flags = dict.fromkeys(_FALLBACK_FLAGS_RE.groupindex, False)
+        unset = len(flags)
+
+        for value in update_data.values():
+            if not value or not isinstance(value, str):
+                continue
+            for match in _FALLBACK_FLAGS_RE.finditer(value):
+                if not flags[match.lastgroup]:
+                    flags[match.lastgroup] = True
+                    unset -= 1
+                    if not unset:
+                        return flags
 
-# Singleton instance
-_processor = None
+        return flags
 
 
+@lru_cache(maxsize=1)
 def get_processor() -> SiteUpdateProcessor:
-    """Get or create the site update processor instance"""
-    global _processor
-    if _processor is None:
-        _processor = SiteUpdateProcessor()
-    return _processor
+    """Get the shared site update processor instance"""
+    return SiteUpdateProcessor()
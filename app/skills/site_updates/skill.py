@@ -5,8 +5,103 @@ Manages site progress updates with AI-powered intelligence extraction.
 """
 
 from typing import Dict, List, Optional
+from app.config import settings
 from app.skills.base_skill import BaseSkill
 
+WEBHOOK_BASE_URL = settings.webhook_base_url.rstrip("/")
+
+# VAPI tool definitions for this skill. Built once at import, with the webhook
+# URLs already resolved; callers get a fresh list but share these
+# definitions, so treat them as read-only.
+SITE_UPDATES_TOOLS = (
+    {
+        "type": "function",
+        "function": {
+            "name": "identify_site_for_update",
+            "description": "Identify which construction site the user wants to provide an update for",
+            "strict": True,
+            "parameters": {
+                "type": "object",
+                "required": ["user_input"],
+                "properties": {
+                    "user_input": {
+                        "type": "string",
+                        "description": "The user's description of which site they want to update"
+                    }
+                }
+            }
+        },
+        "server": {
+            "url": f"{WEBHOOK_BASE_URL}/api/v1/skills/site-updates/identify-site"
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "save_site_progress_update",
+            "description": "Save a complete site progress update with all collected information",
+            "strict": True,
+            "parameters": {
+                "type": "object",
+                "required": ["site_id"],
+                "properties": {
+                    "site_id": {
+                        "type": "string",
+                        "description": "UUID of the site being updated"
+                    },
+                    "main_focus": {
+                        "type": "string",
+                        "description": "Main focus of work at the site today"
+                    },
+                    "is_wet_weather_closure": {
+                        "type": "boolean",
+                        "description": "True if site was closed due to bad weather"
+                    },
+                    "materials_delivered": {
+                        "type": "string",
+                        "description": "Information about materials and deliveries"
+                    },
+                    "work_progress": {
+                        "type": "string",
+                        "description": "Work completed and progress made"
+                    },
+                    "issues": {
+                        "type": "string",
+                        "description": "Problems or issues that came up"
+                    },
+                    "delays": {
+                        "type": "string",
+                        "description": "Delays affecting timeline"
+                    },
+                    "staffing": {
+                        "type": "string",
+                        "description": "Staffing and resource information"
+                    },
+                    "site_visitors": {
+                        "type": "string",
+                        "description": "Site visitors, approvals, and interactions"
+                    },
+                    "site_conditions": {
+                        "type": "string",
+                        "description": "Site conditions, safety observations, access issues"
+                    },
+                    "follow_up_actions": {
+                        "type": "string",
+                        "description": "Follow-up actions and tomorrow's plans"
+                    },
+                    "raw_transcript": {
+                        "type": "string",
+                        "description": "Full conversation transcript for reference"
+                    }
+                }
+            }
+        },
+        "server": {
+            "url": f"{WEBHOOK_BASE_URL}/api/v1/skills/site-updates/save-update"
+        }
+    }
+)
+
 
 class SiteUpdatesSkill(BaseSkill):
     """
@@ -16,6 +111,8 @@ class SiteUpdatesSkill(BaseSkill):
     with AI processing to extract action items, blockers, and concerns.
     """
 
+    REQUIRED_PERMISSIONS = ("site_updates.create", "site_updates.view")
+
     def __init__(self):
         super().__init__(
             skill_key="site_updates",
@@ -29,94 +126,7 @@ class SiteUpdatesSkill(BaseSkill):
 
         Returns list of tool definitions that will be registered with VAPI
         """
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "identify_site_for_update",
-                    "description": "Identify which construction site the user wants to provide an update for",
-                    "strict": True,
-                    "parameters": {
-                        "type": "object",
-                        "required": ["user_input"],
-                        "properties": {
-                            "user_input": {
-                                "type": "string",
-                                "description": "The user's description of which site they want to update"
-                            }
-                        }
-                    }
-                },
-                "server": {
-                    "url": "{WEBHOOK_BASE_URL}/api/v1/skills/site-updates/identify-site"
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "save_site_progress_update",
-                    "description": "Save a complete site progress update with all collected information",
-                    "strict": True,
-                    "parameters": {
-                        "type": "object",
-                        "required": ["site_id"],
-                        "properties": {
-                            "site_id": {
-                                "type": "string",
-                                "description": "UUID of the site being updated"
-                            },
-                            "main_focus": {
-                                "type": "string",
-                                "description": "Main focus of work at the site today"
-                            },
-                            "is_wet_weather_closure": {
-                                "type": "boolean",
-                                "description": "True if site was closed due to bad weather"
-                            },
-                            "materials_delivered": {
-                                "type": "string",
-                                "description": "Information about materials and deliveries"
-                            },
-                            "work_progress": {
-                                "type": "string",
-                                "description": "Work completed and progress made"
-                            },
-                            "issues": {
-                                "type": "string",
-                                "description": "Problems or issues that came up"
-                            },
-                            "delays": {
-                                "type": "string",
-                                "description": "Delays affecting timeline"
-                            },
-                            "staffing": {
-                                "type": "string",
-                                "description": "Staffing and resource information"
-                            },
-                            "site_visitors": {
-                                "type": "string",
-                                "description": "Site visitors, approvals, and interactions"
-                            },
-                            "site_conditions": {
-                                "type": "string",
-                                "description": "Site conditions, safety observations, access issues"
-                            },
-                            "follow_up_actions": {
-                                "type": "string",
-                                "description": "Follow-up actions and tomorrow's plans"
-                            },
-                            "raw_transcript": {
-                                "type": "string",
-                                "description": "Full conversation transcript for reference"
-                            }
-                        }
-                    }
-                },
-                "server": {
-                    "url": "{WEBHOOK_BASE_URL}/api/v1/skills/site-updates/save-update"
-                }
-            }
-        ]
+        return list(SITE_UPDATES_TOOLS)
 
     def get_vapi_assistant_config(self) -> Optional[Dict]:
         """
@@ -170,4 +180,4 @@ class SiteUpdatesSkill(BaseSkill):
 
     def get_required_permissions(self) -> List[str]:
         """Define permissions needed for this skill"""
-        return ["site_updates.create", "site_updates.view"]
+        return list(self.REQUIRED_PERMISSIONS)
@@ -10,6 +10,7 @@ The registry maintains all registered skills and assistants and provides methods
 
 from typing import Dict, List, Optional, TYPE_CHECKING
 from fastapi import FastAPI
+import asyncio
 import logging
 from app.skills.base_skill import BaseSkill
 
@@ -18,6 +19,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Maximum skill or assistant setups in flight at once
+SETUP_CONCURRENCY = 8
+
 
 class SkillRegistry:
     """
@@ -32,9 +36,26 @@ class SkillRegistry:
         registry.register_all_routes(app)
     """
 
+    # A fixed attribute set (no per-instance __dict__); subclasses adding
+    # state should declare their own __slots__
+    __slots__ = (
+        "skills",
+        "assistants",
+        "_skill_infos",
+        "_assistant_ids",
+        "_squad_skills",
+        "_views_version"
+    )
+
     def __init__(self):
         self.skills: Dict[str, BaseSkill] = {}
         self.assistants: Dict[str, "BaseAssistant"] = {}
+        # Derived views of self.skills, rebuilt after a registration or a
+        # change to any skill's tools or assistant (BaseSkill.state_version)
+        self._skill_infos: Optional[List[Dict]] = None
+        self._assistant_ids: Optional[Dict[str, Optional[str]]] = None
+        self._squad_skills: Optional[List[Dict]] = None
+        self._views_version = BaseSkill.state_version
         logger.info("Initialized SkillRegistry")
 
     def register(self, skill: BaseSkill) -> None:
@@ -57,6 +78,7 @@ class SkillRegistry:
             logger.warning(f"Skill {skill.skill_key} already registered, replacing")
 
         self.skills[skill.skill_key] = skill
+        self._invalidate_views()
         logger.info(f"Registered skill: {skill.name} ({skill.skill_key})")
 
     def register_assistant(self, assistant: "BaseAssistant") -> None:
@@ -91,7 +113,10 @@ class SkillRegistry:
         Returns:
             List of skill information dictionaries
         """
-        return [skill.get_info() for skill in self.skills.values()]
+        self._check_views()
+        if self._skill_infos is None:
+            self._skill_infos = [skill.get_info() for skill in self.skills.values()]
+        return list(self._skill_infos)
 
     async def setup_all_skills(self) -> Dict[str, Dict]:
         """
@@ -113,59 +138,89 @@ class SkillRegistry:
         """
         logger.info(f"Setting up {len(self.skills)} skills and {len(self.assistants)} assistants...")
 
+        # Setups are independent VAPI calls, so each step runs them
+        # concurrently (bounded, to stay clear of VAPI rate limits)
+        semaphore = asyncio.Semaphore(SETUP_CONCURRENCY)
+
         # Step 1: Set up all skills (create tools)
-        skill_results = {}
+        skill_outcomes = await asyncio.gather(*(
+            self._create_skill_tools(skill, semaphore) for skill in self.skills.values()
+        ))
+        skill_results = dict(zip(self.skills, skill_outcomes))
+
         all_tool_ids = {}
+        successful_skills = 0
+        for result in skill_outcomes:
+            if result["success"]:
+                all_tool_ids.update(result["tool_ids"])
+                successful_skills += 1
+
+        # Step 2: Set up all assistants (create assistants with tools). If
+        # every skill failed, the assistants would be created without any of
+        # their tools, so skip the VAPI calls.
+        if self.skills and not successful_skills:
+            logger.warning(f"All {len(self.skills)} skills failed to set up, skipping assistant setup")
+            assistant_results = {
+                assistant_key: {
+                    "success": False,
+                    "error": "Skipped because no skills were set up"
+                }
+                for assistant_key in self.assistants
+            }
+        else:
+            assistant_outcomes = await asyncio.gather(*(
+                self._setup_assistant(assistant, all_tool_ids, semaphore) for assistant in self.assistants.values()
+            ))
+            assistant_results = dict(zip(self.assistants, assistant_outcomes))
+
+        successful_assistants = sum(result["success"] for result in assistant_results.values())
+
+        logger.info(f"Setup complete: {successful_skills}/{len(self.skills)} skills, "
+                   f"{successful_assistants}/{len(self.assistants)} assistants")
+
+        return {
+            "skills": skill_results,
+            "assistants": assistant_results,
+            "all_tool_ids": all_tool_ids
+        }
 
-        for skill_key, skill in self.skills.items():
+    async def _create_skill_tools(self, skill: BaseSkill, semaphore: asyncio.Semaphore) -> Dict:
+        """Create one skill's tools, returning its setup result"""
+        async with semaphore:
             try:
                 # Just create tools, not assistants
                 tool_ids = await skill.create_tools()
                 skill.tool_ids = tool_ids
-                all_tool_ids.update(tool_ids)
-
-                skill_results[skill_key] = {
+                logger.info(f"Successfully set up skill: {skill.name} (created {len(tool_ids)} tools)")
+                return {
                     "success": True,
                     "tool_ids": tool_ids
                 }
-                logger.info(f"Successfully set up skill: {skill.name} (created {len(tool_ids)} tools)")
             except Exception as e:
                 logger.error(f"Failed to set up skill {skill.name}: {e}", exc_info=True)
-                skill_results[skill_key] = {
+                return {
                     "success": False,
                     "error": str(e)
                 }
 
-        # Step 2: Set up all assistants (create assistants with tools)
-        assistant_results = {}
-
-        for assistant_key, assistant in self.assistants.items():
+    async def _setup_assistant(self, assistant: "BaseAssistant", all_tool_ids: Dict[str, str],
+                               semaphore: asyncio.Semaphore) -> Dict:
+        """Set up one assistant, returning its setup result"""
+        async with semaphore:
             try:
                 setup_info = await assistant.setup(all_tool_ids)
-                assistant_results[assistant_key] = {
+                logger.info(f"Successfully set up assistant: {assistant.name}")
+                return {
                     "success": True,
                     "info": setup_info
                 }
-                logger.info(f"Successfully set up assistant: {assistant.name}")
             except Exception as e:
                 logger.error(f"Failed to set up assistant {assistant.name}: {e}", exc_info=True)
-                assistant_results[assistant_key] = {
+                return {
                     "success": False,
                     "error": str(e)
                 }
 
-        successful_skills = sum(1 for r in skill_results.values() if r["success"])
-        successful_assistants = sum(1 for r in assistant_results.values() if r["success"])
-
-        logger.info(f"Setup complete: {successful_skills}/{len(self.skills)} skills, "
-                   f"{successful_assistants}/{len(self.assistants)} assistants")
-
-        return {
-            "skills": skill_results,
-            "assistants": assistant_results,
-            "all_tool_ids": all_tool_ids
-        }
-
     def register_all_routes(self, app: FastAPI, prefix: str = "") -> None:
         """
         Register routes for all skills with the FastAPI application.
@@ -213,6 +268,18 @@ class SkillRegistry:
                 "error": str(e)
             }
 
+    def _invalidate_views(self) -> None:
+        """Drop the cached skill info, assistant ID and squad views"""
+        self._skill_infos = None
+        self._assistant_ids = None
+        self._squad_skills = None
+        self._views_version = BaseSkill.state_version
+
+    def _check_views(self) -> None:
+        """Invalidate the cached views if any skill's tools or assistant have changed"""
+        if self._views_version != BaseSkill.state_version:
+            self._invalidate_views()
+
     def get_assistant_ids(self) -> Dict[str, Optional[str]]:
         """
         Get all assistant IDs for registered skills.
@@ -220,10 +287,13 @@ class SkillRegistry:
         Returns:
             Dictionary mapping skill keys to their assistant IDs
         """
-        return {
-            skill_key: skill.assistant_id
-            for skill_key, skill in self.skills.items()
-        }
+        self._check_views()
+        if self._assistant_ids is None:
+            self._assistant_ids = {
+                skill_key: skill.assistant_id
+                for skill_key, skill in self.skills.items()
+            }
+        return dict(self._assistant_ids)
 
     def get_skills_for_squad(self) -> List[Dict]:
         """
@@ -232,15 +302,18 @@ class SkillRegistry:
         Returns:
             List of skill info suitable for squad member configuration
         """
-        return [
-            {
-                "skill_key": skill.skill_key,
-                "skill_name": skill.name,
-                "assistant_id": skill.assistant_id
-            }
-            for skill in self.skills.values()
-            if skill.assistant_id is not None
-        ]
+        self._check_views()
+        if self._squad_skills is None:
+            self._squad_skills = [
+                {
+                    "skill_key": skill.skill_key,
+                    "skill_name": skill.name,
+                    "assistant_id": skill.assistant_id
+                }
+                for skill in self.skills.values()
+                if skill.assistant_id is not None
+            ]
+        return list(self._squad_skills)
 
 
 # Global registry instance
@@ -5,97 +5,78 @@ All webhook endpoints for the voice notes skill using VAPI format.
 """
 
 from fastapi import APIRouter, HTTPException
-from typing import Dict, Optional
+from typing import Dict
+import asyncio
 import logging
-import json
+import re
 import uuid
-import httpx
-import os
+
+import orjson
 
 from app.vapi_utils import extract_vapi_args
-from app.config import settings
+from app.core.http import SUPABASE_WRITE_HEADERS, get_openai_client, get_supabase_client
+from app.core.log_writer import vapi_log_writer
+from app.core.site_matching import (
+    SITE_MATCH_RESPONSE_FORMAT,
+    fuzzy_match_site,
+    parse_site_match,
+    site_match_system_prompt
+)
+from app.core.supabase import (
+    get_session_context_by_call_id,
+    get_tenant_name,
+    get_tenant_site,
+    get_tenant_sites,
+    index_tenant_sites,
+    remember_session_context
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["voice-notes"])
 
+# Words that mark a note as being about a site. Whole words only (plurals
+# allowed), so e.g. "household" or "officer" don't count.
+_SITE_KEYWORDS_RE = re.compile(
+    r"\b(?:site|project|construction|building|house|office)s?\b",
+    re.IGNORECASE
+)
+
+
+def log_vapi_interaction(vapi_call_id: str, interaction_type: str = None,
+                         user_id: str = None, tenant_id: str = None,
+                         caller_phone: str = None, details: dict = None):
+    """Queue a VAPI interaction for the batched audit log (never blocks the caller)"""
+    log_data = {
+        "vapi_call_id": vapi_call_id,
+        "user_id": user_id,
+        "tenant_id": tenant_id,
+        "caller_phone": caller_phone,
+        "raw_log_data": details or {},
+    }
+
+    # Only add interaction_type if provided
+    if interaction_type:
+        log_data["interaction_type"] = interaction_type
 
-# Helper function to get session context
-async def get_session_context_by_call_id(vapi_call_id: str) -> Optional[Dict]:
-    """
-    Get session context from vapi_logs using call ID
-    """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/vapi_logs",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params={
-                    "vapi_call_id": f"eq.{vapi_call_id}",
-                    "interaction_type": "eq.authentication",
-                    "select": "tenant_id,user_id,caller_phone,raw_log_data",
-                    "limit": "1",
-                    "order": "created_at.desc"
-                }
-            )
-
-            if response.status_code == 200:
-                logs = response.json()
-                if logs:
-                    log_entry = logs[0]
-                    return {
-                        "tenant_id": log_entry["tenant_id"],
-                        "user_id": log_entry["user_id"],
-                        "caller_phone": log_entry["caller_phone"],
-                        "user_name": log_entry["raw_log_data"].get("user_name"),
-                        "tenant_name": log_entry["raw_log_data"].get("tenant_name")
-                    }
-
-            logger.warning(f"No session context found for call ID: {vapi_call_id}")
-            return None
-
+        vapi_log_writer.enqueue(log_data)
     except Exception as e:
-        logger.error(f"Error getting session context for call {vapi_call_id}: {str(e)}")
-        return None
-
-
-async def log_vapi_interaction(vapi_call_id: str, interaction_type: str = None,
-                                user_id: str = None, tenant_id: str = None,
-                                caller_phone: str = None, details: dict = None):
-    """Log VAPI interactions for debugging and audit"""
-    try:
-        async with httpx.AsyncClient() as client:
-            log_data = {
-                "vapi_call_id": vapi_call_id,
-                "user_id": user_id,
-                "tenant_id": tenant_id,
-                "caller_phone": caller_phone,
-                "raw_log_data": details or {},
-            }
+        logger.error(f"Failed to log VAPI interaction: {e}")
 
-            # Only add interaction_type if provided
-            if interaction_type:
-                log_data["interaction_type"] = interaction_type
-
-            response = await client.post(
-                f"{settings.SUPABASE_URL}/rest/v1/vapi_logs",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                json=log_data
-            )
 
-            if response.status_code != 201:
-                logger.error(f"Failed to log VAPI interaction: {response.status_code} - {response.text}")
-
-    except Exception as e:
-        logger.error(f"Failed to log VAPI interaction: {e}")
+def _site_note_context(site: Dict, company_name: str) -> Dict:
+    """Build the identify-context result for a note about a matched site"""
+    return {
+        "context_identified": True,
+        "note_type": "site_specific",
+        "site_id": site["id"],
+        "site_name": site["name"],
+        "site_identifier": site.get("identifier"),
+        "site_address": site.get("address"),
+        "message": f"Perfect, I'll save this note for {site['name']}.",
+        "company_name": company_name
+    }
 
 
 @router.post("/api/v1/vapi/authenticate-by-phone")
@@ -124,121 +105,116 @@ async def authenticate_by_phone(request: dict):
         logger.info(f"Authenticating phone: {caller_phone}, call: {vapi_call_id}, toolCallId: {tool_call_id}")
 
         # Authenticate user
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/users",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params={
-                    "phone_number": f"eq.{caller_phone}",
-                    "is_active": "eq.true",
-                    "select": "id,name,phone_number,tenant_id,tenants(name)"
-                }
-            )
-
-            if response.status_code != 200:
-                logger.error(f"Supabase error: {response.status_code}")
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "authorized": False,
-                            "message": "System error during authentication"
-                        }
-                    }]
-                }
-
-            users = response.json()
-            if not users:
-                logger.info("No users found for phone number")
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "authorized": False,
-                            "message": "Phone number not found or not authorized"
-                        }
-                    }]
-                }
-
-            user = users[0]
-            logger.info(f"Found user: {user}")
-
-            # Log this authentication for session context
-            await log_vapi_interaction(
-                vapi_call_id=vapi_call_id,
-                interaction_type="authentication",
-                user_id=user['id'],
-                tenant_id=user['tenant_id'],
-                caller_phone=caller_phone,
-                details={
-                    "user_name": user['name'],
-                    "tenant_name": user['tenants']['name'],
-                    "auth_success": True
-                }
-            )
-
-            # Get skills
-            skills_response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/user_skills",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params={
-                    "user_id": f"eq.{user['id']}",
-                    "is_enabled": "eq.true",
-                    "select": "skills(skill_key,name,description,vapi_assistant_id)"
-                }
-            )
-
-            user_skills = skills_response.json() if skills_response.status_code == 200 else []
-            available_skills = []
-            for user_skill in user_skills:
-                skill = user_skill.get('skills', {})
-                available_skills.append({
-                    "skill_key": skill.get('skill_key'),
-                    "skill_name": skill.get('name'),
-                    "skill_description": skill.get('description', skill.get('name')),
-                    "vapi_assistant_id": skill.get('vapi_assistant_id')
-                })
-
-            # Generate greeting
-            first_name = user['name'].split()[0] if user['name'] else "there"
-
-            if len(available_skills) == 1:
-                greeting = f"Hi {first_name}! Ready for voice notes? Let me connect you right away."
-            else:
-                skill_names = [skill.get('skill_name', 'Unknown') for skill in available_skills]
-                if len(skill_names) == 2:
-                    greeting = f"Hi {first_name}! I can help you with {skill_names[0]} or {skill_names[1]}. What would you like to do?"
-                else:
-                    skills_text = ", ".join(skill_names[:-1]) + f", or {skill_names[-1]}"
-                    greeting = f"Hi {first_name}! I can help you with {skills_text}. What would you like to do?"
+        client = get_supabase_client()
+        response = await client.get(
+            "/users",
+            params={
+                "phone_number": f"eq.{caller_phone}",
+                "is_active": "eq.true",
+                # Enabled skills are embedded so authentication is a single round trip
+                "select": "id,name,phone_number,tenant_id,tenants(name),"
+                          "user_skills(skills(skill_key,name,description,vapi_assistant_id))",
+                "user_skills.is_enabled": "eq.true"
+            }
+        )
 
-            logger.info(f"Successfully authenticated {user['name']} with {len(available_skills)} skills")
+        if response.status_code != 200:
+            logger.error(f"Supabase error: {response.status_code}")
+            return {
+                "results": [{
+                    "toolCallId": tool_call_id,
+                    "result": {
+                        "authorized": False,
+                        "message": "System error during authentication"
+                    }
+                }]
+            }
 
-            # Return VAPI-compatible response
+        users = orjson.loads(response.content)
+        if not users:
+            logger.info("No users found for phone number")
             return {
                 "results": [{
                     "toolCallId": tool_call_id,
                     "result": {
-                        "authorized": True,
-                        "user_id": user['id'],
-                        "user_name": user['name'],
-                        "first_name": first_name,
-                        "tenant_name": user['tenants']['name'],
-                        "phone_number": user['phone_number'],
-                        "greeting_message": greeting,
-                        "available_skills": available_skills,
-                        "skill_count": len(available_skills),
-                        "single_skill_mode": len(available_skills) == 1
+                        "authorized": False,
+                        "message": "Phone number not found or not authorized"
                     }
                 }]
             }
 
+        user = users[0]
+        logger.info(f"Found user: {user}")
+
+        # Log this authentication for session context
+        log_vapi_interaction(
+            vapi_call_id=vapi_call_id,
+            interaction_type="authentication",
+            user_id=user['id'],
+            tenant_id=user['tenant_id'],
+            caller_phone=caller_phone,
+            details={
+                "user_name": user['name'],
+                "tenant_name": user['tenants']['name'],
+                "auth_success": True
+            }
+        )
+
+        # The log row is written in the background, so hand the session
+        # straight to the cache used by the skills' tool calls
+        remember_session_context(vapi_call_id, {
+            "tenant_id": user['tenant_id'],
+            "user_id": user['id'],
+            "caller_phone": caller_phone,
+            "user_name": user['name'],
+            "tenant_name": user['tenants']['name']
+        })
+
+        user_skills = user.get('user_skills') or []
+        available_skills = []
+        for user_skill in user_skills:
+            skill = user_skill.get('skills', {})
+            available_skills.append({
+                "skill_key": skill.get('skill_key'),
+                "skill_name": skill.get('name'),
+                "skill_description": skill.get('description', skill.get('name')),
+                "vapi_assistant_id": skill.get('vapi_assistant_id')
+            })
+
+        # Generate greeting
+        first_name = user['name'].strip().partition(' ')[0] if user.get('name') else "there"
+
+        if len(available_skills) == 1:
+            greeting = f"Hi {first_name}! Ready for voice notes? Let me connect you right away."
+        else:
+            skill_names = [skill.get('skill_name', 'Unknown') for skill in available_skills]
+            if len(skill_names) == 2:
+                greeting = f"Hi {first_name}! I can help you with {skill_names[0]} or {skill_names[1]}. What would you like to do?"
+            else:
+                skills_text = ", ".join(skill_names[:-1]) + f", or {skill_names[-1]}"
+                greeting = f"Hi {first_name}! I can help you with {skills_text}. What would you like to do?"
+
+        logger.info(f"Successfully authenticated {user['name']} with {len(available_skills)} skills")
+
+        # Return VAPI-compatible response
+        return {
+            "results": [{
+                "toolCallId": tool_call_id,
+                "result": {
+                    "authorized": True,
+                    "user_id": user['id'],
+                    "user_name": user['name'],
+                    "first_name": first_name,
+                    "tenant_name": user['tenants']['name'],
+                    "phone_number": user['phone_number'],
+                    "greeting_message": greeting,
+                    "available_skills": available_skills,
+                    "skill_count": len(available_skills),
+                    "single_skill_mode": len(available_skills) == 1
+                }
+            }]
+        }
+
     except Exception as e:
         logger.error(f"Authentication error: {e}")
         return {
@@ -288,100 +264,59 @@ async def identify_voice_note_context(request: dict):
         else:
             tenant_id = session_context["tenant_id"]
 
-            async with httpx.AsyncClient() as client:
-                # Get company name
-                company_response = await client.get(
-                    f"{settings.SUPABASE_URL}/rest/v1/tenants",
-                    headers={
-                        "apikey": settings.SUPABASE_SERVICE_KEY,
-                        "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                    },
-                    params={
-                        "id": f"eq.{tenant_id}",
-                        "select": "name"
-                    }
-                )
-
-                company_name = "your company"
-                if company_response.status_code == 200:
-                    company_data = company_response.json()
-                    if company_data:
-                        company_name = company_data[0]["name"]
+            # Simple heuristic to determine note type
+            is_site_specific = bool(_SITE_KEYWORDS_RE.search(user_input))
 
-                # Simple heuristic to determine note type
-                site_keywords = ["site", "project", "construction", "building", "house", "office"]
-                is_site_specific = any(keyword in user_input.lower() for keyword in site_keywords)
-
-                if not is_site_specific:
+            # Get company name, and available sites (cached per tenant) alongside it if needed
+            if is_site_specific:
+                company_name, sites = await asyncio.gather(
+                    get_tenant_name(tenant_id),
+                    get_tenant_sites(tenant_id)
+                )
+            else:
+                company_name = await get_tenant_name(tenant_id)
+            company_name = company_name or "your company"
+
+            if not is_site_specific:
+                result = {
+                    "context_identified": True,
+                    "note_type": "general",
+                    "message": f"Got it, I'll save this as a general note for {company_name}.",
+                    "company_name": company_name,
+                    "site_id": None
+                }
+            else:
+                if not sites:
                     result = {
                         "context_identified": True,
                         "note_type": "general",
-                        "message": f"Got it, I'll save this as a general note for {company_name}.",
+                        "message": f"I'll record a general note for {company_name}. No active sites found.",
                         "company_name": company_name,
                         "site_id": None
                     }
                 else:
-                    # Get available sites
-                    sites_response = await client.get(
-                        f"{settings.SUPABASE_URL}/rest/v1/entities",
-                        headers={
-                            "apikey": settings.SUPABASE_SERVICE_KEY,
-                            "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                        },
-                        params={
-                            "tenant_id": f"eq.{tenant_id}",
-                            "entity_type": "eq.sites",
-                            "is_active": "eq.true",
-                            "select": "id,name,identifier,address"
-                        }
-                    )
-
-                    if sites_response.status_code != 200 or not sites_response.json():
-                        result = {
-                            "context_identified": True,
-                            "note_type": "general",
-                            "message": f"I'll record a general note for {company_name}. No active sites found.",
-                            "company_name": company_name,
-                            "site_id": None
-                        }
-                    else:
-                        sites = sites_response.json()
+                    # Cheap local fuzzy match first; only ambiguous input goes to OpenAI.
+                    # This is the whole utterance, so a site only matches when most of
+                    # its name is said, not on one shared word.
+                    matching_site = fuzzy_match_site(user_input, sites)
 
+                    if matching_site:
+                        result = _site_note_context(matching_site, company_name)
+                    else:
                         # Use OpenAI to match user input to available sites
-                        site_list = "\n".join([
-                            f"- ID: {site['id']}, Name: {site['name']}, Identifier: {site.get('identifier', 'None')}, Address: {site.get('address', 'None')}"
-                            for site in sites
-                        ])
-
-                        prompt = f"""
-Available construction sites for {company_name}:
-{site_list}
-
-User said: "{user_input}"
-
-Which site are they referring to? You MUST use the exact ID from the list above. Return JSON only:
-{{
-  "site_found": true/false,
-  "site_id": "exact UUID from the ID field above if found, null if not found",
-  "site_name": "exact name if found",
-  "confidence": "high/medium/low"
-}}
-
-IMPORTANT: The site_id MUST be the exact UUID from the ID field, not a shortened version.
-"""
-
-                        # Call OpenAI API for site matching
-                        openai_response = await client.post(
-                            "https://api.openai.com/v1/chat/completions",
-                            headers={
-                                "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                                "Content-Type": "application/json"
-                            },
-                            json={
-                                "model": "gpt-3.5-turbo",
-                                "max_tokens": 500,
-                                "messages": [{"role": "user", "content": prompt}]
-                            }
+                        openai_response = await get_openai_client().post(
+                            "/chat/completions",
+                            headers={"Content-Type": "application/json"},
+                            content=orjson.dumps({
+                                "model": "gpt-4o-mini",
+                                "max_tokens": 100,
+                                "temperature": 0,
+                                "response_format": SITE_MATCH_RESPONSE_FORMAT,
+                                "messages": [
+                                    {"role": "system", "content": site_match_system_prompt(tenant_id, sites)},
+                                    {"role": "user", "content": user_input}
+                                ]
+                            })
                         )
 
                         if openai_response.status_code != 200:
@@ -395,14 +330,9 @@ IMPORTANT: The site_id MUST be the exact UUID from the ID field, not a shortened
                             }
                         else:
                             # Parse OpenAI response
-                            openai_result = openai_response.json()
-                            site_match_text = openai_result["choices"][0]["message"]["content"]
-
-                            # Parse JSON from OpenAI response
-                            try:
-                                site_match = json.loads(site_match_text)
-                            except json.JSONDecodeError as e:
-                                logger.error(f"JSON parsing error: {e}. Response was: {site_match_text}")
+                            site_match = parse_site_match(orjson.loads(openai_response.content))
+
+                            if site_match is None:
                                 result = {
                                     "context_identified": True,
                                     "note_type": "general",
@@ -414,19 +344,10 @@ IMPORTANT: The site_id MUST be the exact UUID from the ID field, not a shortened
                                 # Validate that the returned site_id actually exists
                                 if site_match.get("site_found"):
                                     matched_site_id = site_match["site_id"]
-                                    matching_site = next((site for site in sites if site["id"] == matched_site_id), None)
+                                    matching_site = index_tenant_sites(tenant_id, sites).get(matched_site_id)
 
                                     if matching_site:
-                                        result = {
-                                            "context_identified": True,
-                                            "note_type": "site_specific",
-                                            "site_id": matching_site["id"],
-                                            "site_name": matching_site["name"],
-                                            "site_identifier": matching_site.get("identifier"),
-                                            "site_address": matching_site.get("address"),
-                                            "message": f"Perfect, I'll save this note for {matching_site['name']}.",
-                                            "company_name": company_name
-                                        }
+                                        result = _site_note_context(matching_site, company_name)
                                     else:
                                         result = {
                                             "context_identified": True,
@@ -526,111 +447,81 @@ async def save_voice_note(request: dict):
         user_id = session_context["user_id"]
         caller_phone = session_context["caller_phone"]
 
-        async with httpx.AsyncClient() as client:
-            # Get company name
-            company_response = await client.get(
-                f"{settings.SUPABASE_URL}/rest/v1/tenants",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                },
-                params={
-                    "id": f"eq.{tenant_id}",
-                    "select": "name"
-                }
+        # Get company name, and site name alongside it if site-specific. Both are
+        # only for the reply, so a failed lookup never stops the note being saved.
+        if site_id:
+            company_name, site = await asyncio.gather(
+                get_tenant_name(tenant_id),
+                get_tenant_site(tenant_id, site_id),
+                return_exceptions=True
             )
+        else:
+            company_name, site = await get_tenant_name(tenant_id), None
+        if isinstance(company_name, Exception):
+            logger.error(f"Company name lookup failed for tenant {tenant_id}: {company_name}")
+            company_name = None
+        if isinstance(site, Exception):
+            logger.error(f"Site lookup failed for site {site_id}: {site}")
+            site = None
+        company_name = company_name or "Unknown Company"
+        site_name = site["name"] if site else None
+
+        # Generate unique ID for this note
+        note_id = str(uuid.uuid4())
+
+        # Create note summary (first 100 chars)
+        note_summary = note_content if len(note_content) <= 100 else f"{note_content[:100]}..."
+
+        # Store in voice_notes table
+        voice_note_data = {
+            "id": note_id,
+            "tenant_id": tenant_id,
+            "user_id": user_id,
+            "site_id": site_id,
+            "vapi_call_id": vapi_call_id,
+            "phone_number": caller_phone,
+            "note_type": note_type,
+            "note_content": note_content,
+            "note_summary": note_summary,
+            # Placeholder; the end-of-call report replaces it with the call transcript
+            "full_transcript": f"Voice note: {note_content}"
+        }
 
-            company_name = "Unknown Company"
-            if company_response.status_code == 200:
-                try:
-                    company_data = company_response.json()
-                    if company_data:
-                        company_name = company_data[0]["name"]
-                except:
-                    pass
-
-            # Get site name if site-specific
-            site_name = None
-            if site_id:
-                site_response = await client.get(
-                    f"{settings.SUPABASE_URL}/rest/v1/entities",
-                    headers={
-                        "apikey": settings.SUPABASE_SERVICE_KEY,
-                        "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}"
-                    },
-                    params={
-                        "id": f"eq.{site_id}",
-                        "select": "name"
-                    }
-                )
-                if site_response.status_code == 200:
-                    try:
-                        site_data = site_response.json()
-                        if site_data:
-                            site_name = site_data[0]["name"]
-                    except:
-                        pass
-
-            # Generate unique ID for this note
-            note_id = str(uuid.uuid4())
-
-            # Create note summary (first 100 chars)
-            note_summary = note_content[:100] + "..." if len(note_content) > 100 else note_content
-
-            # Store in voice_notes table
-            voice_note_data = {
-                "id": note_id,
-                "tenant_id": tenant_id,
-                "user_id": user_id,
-                "site_id": site_id,
-                "vapi_call_id": vapi_call_id,
-                "phone_number": caller_phone,
-                "note_type": note_type,
-                "note_content": note_content,
-                "note_summary": note_summary,
-                "full_transcript": f"Voice note: {note_content}"
-            }
+        store_response = await get_supabase_client().post(
+            "/voice_notes",
+            headers=SUPABASE_WRITE_HEADERS,
+            content=orjson.dumps(voice_note_data)
+        )
 
-            store_response = await client.post(
-                f"{settings.SUPABASE_URL}/rest/v1/voice_notes",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                json=voice_note_data
-            )
+        if store_response.status_code == 201:
+            note_location = f" for {site_name}" if site_name else " (general)"
+            logger.info(f"Voice note saved for {company_name}{note_location}: {vapi_call_id}")
 
-            if store_response.status_code == 201:
-                note_location = f" for {site_name}" if site_name else " (general)"
-                logger.info(f"Voice note saved for {company_name}{note_location}: {vapi_call_id}")
-
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "success": True,
-                            "note_id": note_id,
-                            "message": f"All done! I've got that note saved{note_location} for you.",
-                            "company_name": company_name,
-                            "site_name": site_name,
-                            "note_type": note_type
-                        }
-                    }]
-                }
-            else:
-                logger.error(f"Failed to store voice note: {store_response.status_code} - {store_response.text}")
-                return {
-                    "results": [{
-                        "toolCallId": tool_call_id,
-                        "result": {
-                            "success": False,
-                            "error": f"Database error: {store_response.status_code}",
-                            "message": "I'm having trouble saving your note. Please try again."
-                        }
-                    }]
-                }
+            return {
+                "results": [{
+                    "toolCallId": tool_call_id,
+                    "result": {
+                        "success": True,
+                        "note_id": note_id,
+                        "message": f"All done! I've got that note saved{note_location} for you.",
+                        "company_name": company_name,
+                        "site_name": site_name,
+                        "note_type": note_type
+                    }
+                }]
+            }
+        else:
+            logger.error(f"Failed to store voice note: {store_response.status_code} - {store_response.text}")
+            return {
+                "results": [{
+                    "toolCallId": tool_call_id,
+                    "result": {
+                        "success": False,
+                        "error": f"Database error: {store_response.status_code}",
+                        "message": "I'm having trouble saving your note. Please try again."
+                    }
+                }]
+            }
 
     except Exception as e:
         logger.error(f"Voice note storage error: {str(e)}")
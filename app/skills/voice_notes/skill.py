@@ -7,7 +7,6 @@ This skill only defines tools - it does not create assistants.
 
 from typing import Dict, Optional
 from fastapi import FastAPI
-import httpx
 import logging
 
 from app.skills.base_skill import BaseSkill
@@ -115,58 +114,12 @@ class VoiceNotesSkill(BaseSkill):
             }
         }
 
-        tool_ids = {}
         headers = {
             "Authorization": f"Bearer {self.vapi_api_key}",
             "Content-Type": "application/json"
         }
 
-        # Check for existing tools first
-        existing_tools = await self._get_existing_tools(headers)
-
-        async with httpx.AsyncClient() as client:
-            for tool_name, tool_config in tools_config.items():
-                # Skip if tool already exists
-                if tool_name in existing_tools:
-                    tool_ids[tool_name] = existing_tools[tool_name]
-                    logger.info(f"Using existing tool: {tool_name} ({tool_ids[tool_name]})")
-                    continue
-
-                # Create new tool
-                response = await client.post(
-                    f"{self.vapi_base_url}/tool",
-                    headers=headers,
-                    json=tool_config
-                )
-
-                if response.status_code == 201:
-                    tool = response.json()
-                    tool_ids[tool_name] = tool['id']
-                    logger.info(f"Created tool: {tool_name} ({tool_ids[tool_name]})")
-                else:
-                    logger.error(f"Failed to create tool {tool_name}: {response.status_code} - {response.text}")
-                    raise Exception(f"Tool creation failed for {tool_name}: {response.text}")
-
-        return tool_ids
-
-    async def _get_existing_tools(self, headers: Dict) -> Dict[str, str]:
-        """Get existing tools to avoid duplicates"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.vapi_base_url}/tool",
-                headers=headers
-            )
-
-            if response.status_code == 200:
-                tools = response.json()
-                tool_map = {}
-                for tool in tools:
-                    if tool.get('function', {}).get('name'):
-                        tool_map[tool['function']['name']] = tool['id']
-                return tool_map
-            else:
-                logger.warning(f"Failed to get existing tools: {response.status_code}")
-                return {}
+        return await self._create_vapi_tools(tools_config, headers)
 
     async def create_assistant(self, tool_ids: Dict[str, str]) -> str:
         """
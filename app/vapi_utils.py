@@ -35,32 +35,31 @@ def vapi_tool(func: Callable) -> Callable:
             result = await func(function_args)
             
             # Return VAPI-compatible response
-            response = {
-                "results": [{
-                    "toolCallId": tool_call_id,
-                    "result": result
-                }]
-            }
+            response = vapi_reply(tool_call_id, **result)
             
             logger.info(f"VAPI tool response: {func.__name__}, success: {result.get('success', True)}")
             return response
             
         except Exception as e:
             logger.error(f"VAPI tool error in {func.__name__}: {str(e)}")
-            return {
-                "results": [{
-                    "toolCallId": tool_call_id,
-                    "result": {
-                        "success": False,
-                        "error": str(e),
-                        "message": f"Error in {func.__name__}: {str(e)}"
-                    }
-                }]
-            }
+            return vapi_reply(
+                tool_call_id,
+                success=False,
+                error=str(e),
+                message=f"Error in {func.__name__}: {str(e)}"
+            )
     
     return wrapper  # ← THIS LINE WAS MISSING!
 
 
+def vapi_reply(tool_call_id: str, **result: Any) -> Dict[str, Any]:
+    """
+    Build a VAPI tool response
+    Returns: {"results": [{"toolCallId": ..., "result": {...}}]}
+    """
+    return {"results": [{"toolCallId": tool_call_id, "result": result}]}
+
+
 def extract_vapi_args(request: dict) -> tuple[str, dict]:
     """
     Extract tool call ID and arguments from VAPI request
@@ -0,0 +1,46 @@
+-- Migration: Create v_site_progress_updates_formatted view
+-- Description: site_progress_updates in the shape returned by the get-updates API
+--              (renamed JSON columns, nested site object, user name), so the
+--              endpoint can pass rows straight through
+
+CREATE OR REPLACE VIEW v_site_progress_updates_formatted
+WITH (security_invoker = true)  -- Apply the caller's RLS on the underlying tables
+AS
+SELECT
+    s.id,
+    s.tenant_id,
+    s.site_id,
+    s.update_date,
+    s.created_at,
+    s.main_focus,
+    s.materials_delivered,
+    s.work_progress,
+    s.issues,
+    s.delays,
+    s.staffing,
+    s.site_visitors,
+    s.site_conditions,
+    s.follow_up_actions,
+    s.summary_brief,
+    s.summary_detailed,
+    COALESCE(s.extracted_action_items, '[]'::jsonb) AS action_items,
+    COALESCE(s.identified_blockers, '[]'::jsonb) AS blockers,
+    COALESCE(s.flagged_concerns, '[]'::jsonb) AS concerns,
+    COALESCE(s.has_urgent_issues, FALSE) AS has_urgent_issues,
+    COALESCE(s.has_safety_concerns, FALSE) AS has_safety_concerns,
+    COALESCE(s.has_delays, FALSE) AS has_delays,
+    COALESCE(s.is_wet_weather_closure, FALSE) AS is_wet_weather_closure,
+    u.name AS user_name,
+    CASE WHEN e.id IS NULL THEN NULL ELSE jsonb_build_object(
+        'name', e.name,
+        'identifier', e.identifier,
+        'address', e.address
+    ) END AS site,
+    -- Last so CREATE OR REPLACE works over an already-applied view;
+    -- lets callers tell 'processing'/'failed' updates from completed ones
+    s.processing_status
+FROM site_progress_updates s
+LEFT JOIN users u ON u.id = s.user_id
+LEFT JOIN entities e ON e.id = s.site_id;
+
+COMMENT ON VIEW v_site_progress_updates_formatted IS 'site_progress_updates shaped for GET /api/v1/skills/site-updates/get-updates';
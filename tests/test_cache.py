@@ -0,0 +1,89 @@
+"""
+Unit tests for the in-process TTL cache
+"""
+
+import asyncio
+import time
+from app.core.cache import TTLCache
+
+
+class TestTTLCache:
+    """Test TTLCache behaviour"""
+
+    def test_set_and_get(self):
+        """Stored values should be returned until they expire"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert "a" in cache
+        assert cache.get("missing") is None
+        assert cache.get("missing", "default") == "default"
+
+    def test_entries_expire(self):
+        """Entries should disappear once their TTL has passed"""
+        cache = TTLCache(maxsize=10, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert "a" not in cache
+
+    def test_falsy_values_are_cached(self):
+        """Cached None/False/empty values should still count as present"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("empty", [])
+
+        assert "empty" in cache
+        assert cache.get("empty", "default") == []
+
+    def test_least_recently_used_is_evicted(self):
+        """Exceeding maxsize should evict the least recently used entry"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert len(cache) == 2
+
+    def test_pop(self):
+        """pop() should remove and return the value"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+
+        assert cache.pop("a") == 1
+        assert "a" not in cache
+        assert cache.pop("a", "gone") == "gone"
+
+    def test_get_or_load_coalesces_concurrent_misses(self):
+        """Concurrent misses for one key should share a single loader call"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["site"]
+
+        async def run():
+            return await asyncio.gather(*(cache.get_or_load("tenant", loader) for _ in range(5)))
+
+        results = asyncio.run(run())
+
+        assert results == [["site"]] * 5
+        assert len(calls) == 1
+        assert cache.get("tenant") == ["site"]
+
+    def test_get_or_load_does_not_cache_none(self):
+        """A None loader result is a failed lookup and should be retried next time"""
+        cache = TTLCache(maxsize=10, ttl=60)
+
+        async def loader():
+            return None
+
+        assert asyncio.run(cache.get_or_load("tenant", loader)) is None
+        assert "tenant" not in cache
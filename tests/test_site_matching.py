@@ -0,0 +1,136 @@
+"""
+Unit tests for local fuzzy site matching
+"""
+
+from app.core.site_matching import fuzzy_match_site, parse_site_match, substring_match_site
+
+SITES = [
+    {"id": "site-1", "name": "Main Street Renovation", "identifier": "MSR-01", "address": "12 Main St"},
+    {"id": "site-2", "name": "Harbour View Apartments", "identifier": "HVA-02", "address": "4 Quay Rd"},
+]
+
+
+class TestFuzzyMatchSite:
+    """Test fuzzy_match_site"""
+
+    def test_exact_name_matches(self):
+        """A description equal to a site name should match that site"""
+        assert fuzzy_match_site("harbour view apartments", SITES)["id"] == "site-2"
+
+    def test_identifier_matches(self):
+        """Site identifiers should be matched as well as names"""
+        assert fuzzy_match_site("MSR-01", SITES)["id"] == "site-1"
+
+    def test_unrelated_description_is_left_for_llm(self):
+        """Descriptions that don't resemble any site should not match"""
+        assert fuzzy_match_site("the warehouse job", SITES) is None
+
+    def test_ambiguous_description_is_left_for_llm(self):
+        """Two equally strong candidates should not be guessed between"""
+        sites = [
+            {"id": "north", "name": "Main Street North"},
+            {"id": "south", "name": "Main Street South"},
+        ]
+        assert fuzzy_match_site("main street", sites) is None
+
+    def test_clear_winner_matches_despite_similar_runner_up(self):
+        """A close-but-clearly-better match should not be sent to the LLM"""
+        sites = [
+            {"id": "north", "name": "Riverside North Tower"},
+            {"id": "depot", "name": "Riverside Depot"},
+        ]
+        assert fuzzy_match_site("riverside north towers", sites)["id"] == "north"
+
+    def test_shared_generic_word_does_not_pick_wrong_site(self):
+        """One shared word like "street" or "apartment" is not a site match"""
+        assert fuzzy_match_site("the apartment block on George Street", SITES) is None
+        assert fuzzy_match_site("the house on main", SITES) is None
+
+    def test_voice_note_sharing_one_word_with_a_site_is_left_for_llm(self):
+        """Whole voice-note utterances with one incidental site word should not match"""
+        assert fuzzy_match_site("the view from the crane is great, note for the project", SITES) is None
+        assert fuzzy_match_site("note for the site, the main gate was left open", SITES) is None
+        assert fuzzy_match_site("the renovation crew finished early on this project", SITES) is None
+
+    def test_voice_note_naming_a_site_matches(self):
+        """A voice-note utterance that names the site should still match locally"""
+        note = "note for the harbour view apartments project, the crane is booked"
+        assert fuzzy_match_site(note, SITES)["id"] == "site-2"
+
+    def test_partial_address_is_left_for_llm(self):
+        """Addresses must match almost fully, since street words are shared"""
+        sites = SITES + [{"id": "site-3", "name": "Station Road Depot", "address": "9 Quay St"}]
+        assert fuzzy_match_site("the job on quay", sites) is None
+
+    def test_full_address_matches(self):
+        """A description giving the whole address should match"""
+        assert fuzzy_match_site("4 quay rd", SITES)["id"] == "site-2"
+
+    def test_misheard_name_matches(self):
+        """Small speech-to-text errors in every word should still match"""
+        assert fuzzy_match_site("harbor view apartmens", SITES)["id"] == "site-2"
+
+    def test_identifier_within_description_matches(self):
+        """An identifier mentioned in a longer description should match"""
+        assert fuzzy_match_site("update for MSR-01 today", SITES)["id"] == "site-1"
+
+    def test_single_site_accepts_partial_description(self):
+        """With only one site, a partial name is enough"""
+        assert fuzzy_match_site("harbour", SITES[1:])["id"] == "site-2"
+
+    def test_empty_description(self):
+        """Empty input should never match"""
+        assert fuzzy_match_site("  ", SITES) is None
+
+    def test_short_fragment_is_left_for_llm(self):
+        """One- or two-character fragments should never be accepted locally"""
+        sites = SITES + [{"id": "site-3", "name": "Station Road Depot", "identifier": "SRD-03", "address": "9 Station St"}]
+        assert fuzzy_match_site("e", SITES[1:]) is None
+        assert fuzzy_match_site("a", sites) is None
+        assert fuzzy_match_site("st", sites) is None
+
+
+class TestSubstringMatchSite:
+    """Test substring_match_site"""
+
+    def test_unique_substring_matches(self):
+        """A fragment found in only one site should match it"""
+        assert substring_match_site("quay", SITES)["id"] == "site-2"
+
+    def test_short_fragment_does_not_match(self):
+        """A fragment below the minimum length should not match even if unique"""
+        assert substring_match_site("qu", SITES) is None
+
+    def test_shared_substring_does_not_match(self):
+        """A fragment found in several sites should not pick one"""
+        assert substring_match_site("a", SITES) is None
+
+    def test_partial_name_wins_before_fuzzy_scoring(self):
+        """fuzzy_match_site should accept a unique partial name among several sites"""
+        assert fuzzy_match_site("Main Street", SITES)["id"] == "site-1"
+
+
+def _completion(content, finish_reason="stop", refusal=None):
+    """Minimal OpenAI chat completion with one choice"""
+    return {"choices": [{"finish_reason": finish_reason, "message": {"content": content, "refusal": refusal}}]}
+
+
+class TestParseSiteMatch:
+    """Test parse_site_match"""
+
+    def test_valid_content_is_parsed(self):
+        """Well-formed structured output should be returned as a dict"""
+        content = '{"site_found": true, "site_id": "site-1", "site_name": "Main Street Renovation", "confidence": "high"}'
+        assert parse_site_match(_completion(content))["site_id"] == "site-1"
+
+    def test_refusal_returns_none(self):
+        """A refusal has null content and should not raise"""
+        assert parse_site_match(_completion(None, refusal="I can't help with that")) is None
+
+    def test_truncated_content_returns_none(self):
+        """Output cut off at max_tokens should not be parsed"""
+        assert parse_site_match(_completion('{"site_found": true, "site_', finish_reason="length")) is None
+
+    def test_invalid_json_returns_none(self):
+        """Malformed content should not raise"""
+        assert parse_site_match(_completion("not json")) is None
@@ -40,6 +40,20 @@ class TestBaseSkill:
         assert info["assistant_id"] is None
         assert info["is_ready"] is False
 
+    def test_skill_get_info_refreshes_after_setup_fields_change(self):
+        """get_info() should be cached but rebuilt when tool_ids/assistant_id change"""
+        skill = VoiceNotesSkill()
+        assert skill.get_info() is skill.get_info()
+
+        skill.tool_ids = {"save_note": "tool_123"}
+        skill.assistant_id = "test_assistant_id"
+        info = skill.get_info()
+
+        assert info["tool_count"] == 1
+        assert info["tools"] == ["save_note"]
+        assert info["assistant_id"] == "test_assistant_id"
+        assert info["is_ready"] is True
+
 
 class TestSkillRegistry:
     """Test SkillRegistry functionality"""
@@ -89,6 +103,17 @@ class TestSkillRegistry:
         assert skills[0]["skill_key"] == "voice_notes"
         assert skills[0]["name"] == "Voice Notes"
 
+    def test_list_skills_reflects_setup_changes(self):
+        """Cached list_skills() output should refresh when a skill's tools change"""
+        registry = SkillRegistry()
+        skill = VoiceNotesSkill()
+        registry.register(skill)
+
+        assert registry.list_skills()[0]["tool_count"] == 0
+
+        skill.tool_ids = {"save_note": "tool_123"}
+        assert registry.list_skills()[0]["tool_count"] == 1
+
     def test_get_assistant_ids(self):
         """get_assistant_ids() should return dict of skill keys to assistant IDs"""
         registry = SkillRegistry()